@@ -9,21 +9,110 @@ import argparse
 import subprocess
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import base64
+import hashlib
 from datetime import datetime
 from PIL import Image, ExifTags
 import git
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import time
+import random
 import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+import gallery
+import catalog
+import tracing
+import scheduling
+import journal
+import watching
+import dedupe
+
+# Watermark parameters; part of the manifest signature so changing them re-uploads the album
+WATERMARK_PARAMS = {'landscape_scale': 0.25, 'portrait_scale': 0.33, 'quality': 95}
+
+# Automator instance owned by each watermarking worker process
+_worker_automator = None
+
+
+def git_blob_sha(path: str) -> str:
+    """SHA git (and GitHub) assign to a file's content"""
+    h = hashlib.sha1(b'blob %d\0' % os.path.getsize(path))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Base64JSONBody:
+    """JSON request body with a file's base64 `content`, streamed from disk"""
+
+    # A multiple of 3 bytes, so the base64 pieces concatenate without padding in between
+    CHUNK_SIZE = 3 * (1 << 16)
+
+    def __init__(self, path: str, fields: dict):
+        self.path = path
+        self.size = os.path.getsize(path)
+        # The fields go first; the prefix ends by opening the content string
+        self.prefix = (json.dumps(fields)[:-1] + (', ' if fields else '') + '"content": "').encode()
+        self.suffix = b'"}'
+
+    def __len__(self) -> int:
+        return len(self.prefix) + 4 * ((self.size + 2) // 3) + len(self.suffix)
+
+    def __iter__(self):
+        # Re-read on every iteration so a retried request sends the whole body again
+        yield self.prefix
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                yield base64.b64encode(chunk)
+        yield self.suffix
+
+
+def _init_watermark_worker(automator):
+    """Store the automator in the worker process (runs once per worker)"""
+    global _worker_automator
+    _worker_automator = automator
+
+
+def _watermark_worker(input_path: str, output_path: str, thumbnail_dir: str = None) -> bool:
+    """Watermark a single photo inside a worker process"""
+    try:
+        return _worker_automator.add_watermark(input_path, output_path, thumbnail_dir)
+    finally:
+        # Pool workers never run atexit, so hand the spans over after every photo
+        tracing.flush()
+
 
 class PhotoGalleryAutomator:
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json", jobs: int = None, max_memory: int = None,
+                 dedupe_mode: str = None):
         """Initialize with configuration"""
         self.config = self.load_config(config_file)
         self.current_year = datetime.now().year
         self.github_token = self.config.get('github_token')
         self.github_username = self.config.get('github_username', 'RocknBirra')
+        self.jobs = jobs or self.config.get('jobs') or os.cpu_count() or 1
+        # Memory budget in bytes for the image workers (None: no limit)
+        max_memory_mb = max_memory or self.config.get('max_memory_mb')
+        self.max_memory = max_memory_mb * 2 ** 20 if max_memory_mb else None
+        # Near-duplicate handling before watermarking: None, 'flag' (report only) or 'skip' (leave new ones out)
+        self.dedupe_mode = dedupe_mode or self.config.get('dedupe')
+        self.logo_cache_size = self.config.get('watermark_cache_size', 8)
+        self._logo = None
+        self._logo_cache = OrderedDict()  # watermark width -> resized RGBA logo (LRU)
+        self.github_api_url = self.config.get('github_api_url', 'https://api.github.com').rstrip('/')
+        self.upload_workers = self.config.get('upload_workers', 4)
+        self.upload_retries = self.config.get('upload_retries', 5)
+        self.retry_backoff = self.config.get('retry_backoff', 1.0)
+        self.request_timeout = self.config.get('request_timeout', 60)
+        self._session = None
+        self.thumbnail_heights = tuple(sorted(self.config.get('thumbnail_heights', gallery.THUMBNAIL_HEIGHTS), reverse=True))
+        self.thumbnail_formats = gallery.available_formats(self.config.get('thumbnail_formats', gallery.THUMBNAIL_FORMATS))
         
     def load_config(self, config_file: str) -> dict:
         """Load configuration from JSON file"""
@@ -31,12 +120,36 @@ class PhotoGalleryAutomator:
             return json.load(f)
 
     def load_watermark_logo(self) -> Image.Image:
-        """Load the watermark logo image"""
+        """Load the watermark logo image (once per process unless caching is disabled)"""
+        if self._logo is not None:
+            return self._logo
         logo_path = self.config.get('watermark_logo_path', 'assets/logo.png')
         logo = Image.open(logo_path)
         if logo.mode != 'RGBA':
             logo = logo.convert('RGBA')
+        logo.load()
+        if self.logo_cache_size > 0:
+            self._logo = logo
         return logo
+
+    def get_resized_logo(self, watermark_width: int) -> Image.Image:
+        """Return the logo resized to watermark_width, reusing cached sizes"""
+        logo_resized = self._logo_cache.get(watermark_width)
+        if logo_resized is not None:
+            self._logo_cache.move_to_end(watermark_width)
+            return logo_resized
+        
+        # Resize logo maintaining aspect ratio
+        logo = self.load_watermark_logo()
+        logo_aspect = logo.width / logo.height
+        logo_height = int(watermark_width / logo_aspect)
+        logo_resized = logo.resize((watermark_width, logo_height), Image.Resampling.LANCZOS)
+        
+        if self.logo_cache_size > 0:
+            self._logo_cache[watermark_width] = logo_resized
+            if len(self._logo_cache) > self.logo_cache_size:
+                self._logo_cache.popitem(last=False)
+        return logo_resized
     
     def correct_orientation(self, img):
         """Correct image orientation based on EXIF data"""
@@ -65,71 +178,160 @@ class PhotoGalleryAutomator:
                     img = img.rotate(90, expand=True)
         return img
 
-    def add_watermark(self, image_path: str, output_path: str) -> bool:
-        """Add logo watermark to bottom center of image"""
+    def add_watermark(self, image_path: str, output_path: str, thumbnail_dir: str = None) -> bool:
+        """Add logo watermark to bottom center of image, optionally writing gallery thumbnails too"""
         try:
-            with Image.open(image_path) as img:
-                img = self.correct_orientation(img)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
+            with tracing.profiled(), tracing.span('add_watermark', file=os.path.basename(image_path)), \
+                    Image.open(image_path) as source:
+                with tracing.span('watermark.decode'):
+                    source.load()
+                    img = self.correct_orientation(source)
+                    if img.mode != 'RGB':
+                        img = img.convert('RGB')
+                    # Free the decoded original as soon as a rotated or converted copy replaces it
+                    if img is not source:
+                        source.close()
                 width, height = img.size
                 is_landscape = width > height
-                logo = self.load_watermark_logo()
                 
                 # Calculate watermark size based on orientation
-                logo_scale = 0.25 if is_landscape else 0.33  # 25% for landscape, 33% for portrait
+                logo_scale = WATERMARK_PARAMS['landscape_scale' if is_landscape else 'portrait_scale']
                 watermark_width = int(width * logo_scale)
-                
-                # Resize logo maintaining aspect ratio
-                logo_aspect = logo.width / logo.height
-                logo_height = int(watermark_width / logo_aspect)
-                logo_resized = logo.resize((watermark_width, logo_height), Image.Resampling.LANCZOS)
+                logo_resized = self.get_resized_logo(watermark_width)
+                logo_height = logo_resized.height
                 
                 # Calculate bottom center position
                 margin_bottom = self.config.get('margin_bottom', 30)
                 x = (width - watermark_width) // 2  # Center horizontally
                 y = height - logo_height - margin_bottom  # Bottom with margin
                 
-                # Create a copy of the original image
-                result = img.convert('RGBA')
+                with tracing.span('watermark.paste'):
+                    # Paste the logo straight onto the RGB image, its alpha as the mask: same pixels as
+                    # compositing on an RGBA copy, without two extra full-resolution buffers
+                    result = img
+                    result.paste(logo_resized, (x, y), logo_resized)
+                with tracing.span('watermark.encode') as span:
+                    result.save(output_path, 'JPEG', quality=WATERMARK_PARAMS['quality'])
+                    span.set(bytes=os.path.getsize(output_path))
                 
-                # Paste the logo with full opacity at bottom center
-                result.paste(logo_resized, (x, y), logo_resized)
-                
-                # Convert back to RGB and save
-                result.convert('RGB').save(output_path, 'JPEG', quality=95)
+                # Derive the gallery thumbnails from the in-memory image instead of re-decoding
+                if thumbnail_dir:
+                    base_name = os.path.splitext(os.path.basename(output_path))[0]
+                    gallery.create_thumbnails_from_image(result, base_name, thumbnail_dir, self.thumbnail_heights,
+                                                         self.thumbnail_formats)
                 
                 return True
         except Exception as e:
             print(f"Error watermarking {image_path}: {e}")
             return False
 
+    @tracing.traced
+    def watermark_photos(self, files: List[Tuple[str, str]], thumbnail_dir: str = None,
+                         on_done: Callable[[str, str], None] = None) -> List[Tuple[str, str]]:
+        """Watermark (input_path, output_path) pairs in parallel"""
+        # on_done(src, dst) runs as each photo succeeds; the successes are returned in input order
+        on_done = on_done or (lambda src, dst: None)
+        workers, budget = scheduling.plan_workers(min(self.jobs, len(files)), self.max_memory)
+        if workers <= 1:
+            watermarked = []
+            for src, dst in files:
+                if self.add_watermark(src, dst, thumbnail_dir):
+                    on_done(src, dst)
+                    watermarked.append((src, dst))
+            return watermarked
+
+        succeeded = set()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_watermark_worker,
+                                 initargs=(self,)) as executor:
+            # Photos are admitted while their estimated decoded size fits in the memory budget
+            jobs = [(src, dst, thumbnail_dir) for src, dst in files]
+            for (src, dst, _), future in scheduling.submit_within_budget(
+                    executor, _watermark_worker, jobs, lambda job: scheduling.image_job_memory(job[0]), budget):
+                try:
+                    if future.result():
+                        succeeded.add(dst)
+                        on_done(src, dst)
+                except Exception as e:
+                    print(f"Error watermarking {src}: {e}")
+        return [(src, dst) for src, dst in files if dst in succeeded]
+
+    def __getstate__(self):
+        """Drop the HTTP session when the automator is sent to a worker process"""
+        state = self.__dict__.copy()
+        state['_session'] = None
+        return state
+
+    @property
+    def session(self) -> requests.Session:
+        """Shared keep-alive session sized for the upload concurrency"""
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.upload_workers)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+            self._session.headers.update({
+                'Authorization': f'token {self.github_token}',
+                'Accept': 'application/vnd.github.v3+json'
+            })
+        return self._session
+
+    def retry_delay(self, response, attempt: int) -> float:
+        """Seconds to wait before retrying a response, or None if it should not be retried"""
+        secondary_limit = response.status_code in (403, 429) and (
+            'Retry-After' in response.headers
+            or response.headers.get('X-RateLimit-Remaining') == '0'
+            or 'secondary rate limit' in response.text.lower())
+        # 409: a concurrent contents API commit moved the branch under us; a stale sha ("does not match") won't heal
+        conflict = response.status_code == 409 and 'does not match' not in response.text
+        if not (secondary_limit or response.status_code >= 500 or conflict):
+            return None
+        if 'Retry-After' in response.headers:
+            return float(response.headers['Retry-After'])
+        if response.headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in response.headers:
+            return max(0.0, float(response.headers['X-RateLimit-Reset']) - time.time())
+        return self.backoff(attempt)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter"""
+        # Randomized so uploads that conflicted with each other don't all retry at the same instant again
+        return self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def github_request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Call the GitHub API, retrying 5xx, conflicts and secondary rate limits with backoff"""
+        url = f"{self.github_api_url}/{path}"
+        for attempt in range(self.upload_retries + 1):
+            try:
+                with tracing.span('http', method=method, path=path, attempt=attempt) as span:
+                    response = self.session.request(method, url, timeout=self.request_timeout, **kwargs)
+                    span.set(status=response.status_code, bytes=len(response.request.body or b''))
+            except requests.ConnectionError:
+                if attempt == self.upload_retries:
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            delay = self.retry_delay(response, attempt)
+            if delay is None or attempt == self.upload_retries:
+                return response
+            time.sleep(delay)
+        return response
+
     def create_github_repo(self, repo_name: str) -> bool:
         """Create GitHub repository if it doesn't exist"""
-        url = f"https://api.github.com/user/repos"
-        headers = {
-            'Authorization': f'token {self.github_token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
         data = {
             'name': repo_name,
             'description': f'Photo gallery for {self.current_year}',
-            'public': True
+            'public': True,
+            'auto_init': True  # the Git Data API cannot write to an empty repository
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = self.github_request('POST', 'user/repos', json=data)
         return response.status_code in [201, 422]  # 201 = created, 422 = already exists
 
+    @tracing.traced
     def get_existing_files(self, repo_name: str, date_str: str) -> dict:
         """Get list of files already in the GitHub repository with their SHA"""
         try:
-            url = f"https://api.github.com/repos/{self.github_username}/{repo_name}/contents/{date_str}"
-            headers = {
-                'Authorization': f'token {self.github_token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            response = requests.get(url, headers=headers)
+            response = self.github_request('GET', f"repos/{self.github_username}/{repo_name}/contents/{date_str}")
             if response.status_code == 200:
                 files = response.json()
                 return {file['name']: file['sha'] for file in files if file['type'] == 'file'}
@@ -137,93 +339,235 @@ class PhotoGalleryAutomator:
         except:
             return {}
 
+    def get_remote_sha(self, repo_name: str, github_path: str) -> str:
+        """Blob SHA of a single file in the GitHub repository (None if it does not exist)"""
+        response = self.github_request('GET', f"repos/{self.github_username}/{repo_name}/contents/{github_path}")
+        if response.status_code == 200 and isinstance(response.json(), dict):
+            return response.json().get('sha')
+        return None
+
+    @tracing.traced
     def delete_file_from_github(self, repo_name: str, date_str: str, filename: str, sha: str) -> bool:
         """Delete a file from GitHub repository"""
         try:
             github_path = f"{date_str}/{filename}"
-            url = f"https://api.github.com/repos/{self.github_username}/{repo_name}/contents/{github_path}"
-            headers = {
-                'Authorization': f'token {self.github_token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
             data = {
                 'message': f'Remove {filename}',
                 'sha': sha
             }
             
-            response = requests.delete(url, headers=headers, json=data)
-            return response.status_code == 200
+            response = self.github_request('DELETE', f"repos/{self.github_username}/{repo_name}/contents/{github_path}",
+                                           json=data)
+            return response.status_code in [200, 404]  # 404: already gone, e.g. removed by an interrupted run
             
         except Exception as e:
             print(f"Error deleting {filename}: {e}")
             return False
         
     def delete_local_thumbnails(self, date_str: str, filename: str) -> bool:
-        """Delete corresponding thumbnail files from local 406px and 768px directories"""
+        """Delete every thumbnail rendition of a photo from the local album directories"""
         try:
             base_name = os.path.splitext(filename)[0]
-            thumbnail_name = f"{base_name}.webp"
-            
             outputdir = f"images/{self.current_year}/{date_str}/"
-            thumb_406_path = os.path.join(outputdir, "406px", thumbnail_name)
-            thumb_768_path = os.path.join(outputdir, "768px", thumbnail_name)
             
             deleted_count = 0
-            for thumb_path in [thumb_406_path, thumb_768_path]:
+            for thumb_path in self.thumbnail_paths(outputdir, base_name):
                 if os.path.exists(thumb_path):
                     os.remove(thumb_path)
                     deleted_count += 1
             
+            # Forget the cached sizes too, so gallery.py picks up whatever replaces them
+            index = gallery.load_index(outputdir)
+            if index.pop(filename, None) is not None:
+                gallery.save_index(outputdir, index)
+            
             return deleted_count > 0
         except Exception as e:
             print(f"Error deleting local thumbnails for {filename}: {e}")
             return False
 
-    def batch_upload_to_github(self, files_to_upload: List[Tuple[str, str]], repo_name: str, date_str: str) -> List[str]:
+    def has_local_thumbnails(self, date_str: str, filenames: List[str]) -> bool:
+        """Check that every file already has all its thumbnail renditions locally"""
+        outputdir = f"images/{self.current_year}/{date_str}/"
+        index = gallery.load_index(outputdir)
+        # Indexed for the current ladder too, so gallery.py can run from the index alone
+        for filename in filenames:
+            entry = index.get(filename)
+            if (entry is None or gallery.entry_formats(entry) != list(self.thumbnail_formats)
+                    or gallery.entry_quality(entry) != dict(self.thumbnail_formats)
+                    or gallery.entry_heights(entry) != sorted(self.thumbnail_heights, reverse=True)):
+                return False
+            for thumb_path in gallery.rendition_paths(outputdir, os.path.splitext(filename)[0], self.thumbnail_heights,
+                                                      self.thumbnail_formats):
+                if not os.path.exists(thumb_path):
+                    return False
+        return True
+
+    def thumbnail_paths(self, outputdir: str, base_name: str) -> List[str]:
+        """Rendition paths of the configured ladder plus the legacy 406px/768px WebP ones"""
+        paths = gallery.rendition_paths(outputdir, base_name, self.thumbnail_heights, self.thumbnail_formats)
+        return list(dict.fromkeys(paths + gallery.rendition_paths(outputdir, base_name, (768, 406), {'webp': 85})))
+
+    @tracing.traced
+    def upload_file_to_github(self, local_path: str, filename: str, repo_name: str, date_str: str,
+                              sha: str = None) -> bool:
+        """Upload a single file to GitHub repository"""
+        try:
+            github_path = f"{date_str}/{filename}"
+            data = {
+                'message': f'Update {filename}' if sha else f'Add {filename}'
+            }
+            # Replacing a file takes the SHA of the blob it replaces
+            if sha:
+                data['sha'] = sha
+            
+            response = self.github_request('PUT', f"repos/{self.github_username}/{repo_name}/contents/{github_path}",
+                                           data=Base64JSONBody(local_path, data),
+                                           headers={'Content-Type': 'application/json'})
+            if (response.status_code == 422 and not sha) or (response.status_code == 409 and 'does not match' in response.text):
+                # Already there (e.g. uploaded by an interrupted run) or changed since the manifest recorded it:
+                # done if identical, replaced otherwise
+                remote_sha = self.get_remote_sha(repo_name, github_path)
+                if remote_sha == git_blob_sha(local_path):
+                    print(f"✓ {filename} (already uploaded)")
+                    return True
+                if remote_sha and remote_sha != sha:
+                    return self.upload_file_to_github(local_path, filename, repo_name, date_str, remote_sha)
+            
+            if response.status_code in [200, 201]:
+                print(f"✓ {filename}")
+                return True
+            print(f"✗ {filename}: HTTP {response.status_code}")
+            return False
+                
+        except Exception as e:
+            print(f"✗ {filename}: {e}")
+            return False
+
+    @tracing.traced
+    def batch_upload_to_github(self, files_to_upload: List[Tuple[str, str]], repo_name: str, date_str: str,
+                               existing_shas: dict = None, on_uploaded: Callable[[str], None] = None) -> List[str]:
         """Upload multiple files to GitHub repository"""
-        uploaded_files = []
+        existing_shas = existing_shas or {}
+        uploaded = set()
+        # At most upload_workers requests in flight; on_uploaded(filename) runs as each one succeeds
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            futures = {executor.submit(self.upload_file_to_github, local_path, filename, repo_name, date_str,
+                                       existing_shas.get(filename)): filename
+                       for local_path, filename in files_to_upload}
+            for future in as_completed(futures):
+                if future.result():
+                    uploaded.add(futures[future])
+                    if on_uploaded:
+                        on_uploaded(futures[future])
+        return [filename for _, filename in files_to_upload if filename in uploaded]
+
+    @tracing.traced
+    def create_blob(self, local_path: str, repo_name: str) -> str:
+        """Upload a file as a git blob and return its SHA (None on failure)"""
+        response = self.github_request('POST', f"repos/{self.github_username}/{repo_name}/git/blobs",
+                                       data=Base64JSONBody(local_path, {'encoding': 'base64'}),
+                                       headers={'Content-Type': 'application/json'})
+        if response.status_code == 201:
+            return response.json()['sha']
+        print(f"✗ {os.path.basename(local_path)}: HTTP {response.status_code}")
+        return None
+
+    @tracing.traced
+    def commit_album_to_github(self, files_to_upload: List[Tuple[str, str]], files_to_delete: List[str],
+                               repo_name: str, date_str: str,
+                               reused_blobs: List[Tuple[str, str]] = (),
+                               on_blob: Callable[[str, str], None] = None) -> Tuple[List[str], List[str]]:
+        """Push all additions and deletions of an album as one commit through the Git Data API"""
+        repo_path = f"repos/{self.github_username}/{repo_name}"
+        branch = self.config.get('photo_repo_branch', 'main')
         
-        for local_path, filename in files_to_upload:
-            try:
-                with open(local_path, 'rb') as f:
-                    content = base64.b64encode(f.read()).decode()
-                
-                github_path = f"{date_str}/{filename}"
-                url = f"https://api.github.com/repos/{self.github_username}/{repo_name}/contents/{github_path}"
-                headers = {
-                    'Authorization': f'token {self.github_token}',
-                    'Accept': 'application/vnd.github.v3+json'
-                }
-                
-                data = {
-                    'message': f'Add {filename}',
-                    'content': content
-                }
-                
-                response = requests.put(url, headers=headers, json=data)
-                
-                if response.status_code in [200, 201]:
-                    uploaded_files.append(filename)
+        # Blobs are content-addressed, so they can be created in parallel and reused across retries;
+        # on_blob(filename, sha) runs as each one is created
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            futures = {executor.submit(self.create_blob, local_path, repo_name): filename
+                       for local_path, filename in files_to_upload}
+            created = {}
+            for future in as_completed(futures):
+                created[futures[future]] = future.result()
+                if created[futures[future]] and on_blob:
+                    on_blob(futures[future], created[futures[future]])
+        # reused_blobs (filename, sha) are already on GitHub and go straight into the tree
+        blobs = [(filename, created[filename]) for _, filename in files_to_upload if created[filename]] + list(reused_blobs)
+        
+        tree = [{'path': f"{date_str}/{filename}", 'mode': '100644', 'type': 'blob', 'sha': sha}
+                for filename, sha in blobs]
+        tree += [{'path': f"{date_str}/{filename}", 'mode': '100644', 'type': 'blob', 'sha': None}
+                 for filename in files_to_delete]
+        if not tree:
+            return [], []
+        
+        message = f"Update {date_str}: {len(blobs)} added, {len(files_to_delete)} removed"
+        for attempt in range(3):
+            ref = self.github_request('GET', f"{repo_path}/git/ref/heads/{branch}")
+            if ref.status_code != 200:
+                print(f"✗ Could not read {branch} of {repo_name}: HTTP {ref.status_code}")
+                return [], []
+            head_sha = ref.json()['object']['sha']
+            head = self.github_request('GET', f"{repo_path}/git/commits/{head_sha}")
+            if head.status_code != 200:
+                print(f"✗ Could not read commit {head_sha[:7]} of {repo_name}: HTTP {head.status_code}")
+                return [], []
+            base_tree = head.json()['tree']['sha']
+            
+            new_tree = self.github_request('POST', f"{repo_path}/git/trees", json={'base_tree': base_tree, 'tree': tree})
+            if new_tree.status_code != 201:
+                print(f"✗ Tree creation failed: HTTP {new_tree.status_code}")
+                return [], []
+            commit = self.github_request('POST', f"{repo_path}/git/commits", json={
+                'message': message,
+                'tree': new_tree.json()['sha'],
+                'parents': [head_sha]
+            })
+            if commit.status_code != 201:
+                print(f"✗ Commit creation failed: HTTP {commit.status_code}")
+                return [], []
+            
+            # Fast-forward only: if someone else pushed meanwhile, rebuild on top of their commit
+            update = self.github_request('PATCH', f"{repo_path}/git/refs/heads/{branch}",
+                                         json={'sha': commit.json()['sha'], 'force': False})
+            if update.status_code == 200:
+                for filename, _ in blobs:
                     print(f"✓ {filename}")
-                    
-            except Exception as e:
-                print(f"✗ {filename}: {e}")
+                return [filename for filename, _ in blobs], list(files_to_delete)
+            # Only a rejected fast-forward means the branch moved; anything else (auth, missing ref...) won't heal
+            if update.status_code != 422 or 'fast forward' not in update.text.lower():
+                print(f"✗ Could not update {branch} of {repo_name}: HTTP {update.status_code}")
+                return [], []
+            print(f"ℹ {branch} moved while committing, retrying ({attempt + 1}/3)")
+        
+        print(f"✗ Could not update {branch} of {repo_name}")
+        return [], []
+
+    def photo_repo_dir(self, repo_name: str) -> str:
+        """Local checkout directory of the photo repository"""
+        return self.config.get('photo_repo_dir_template', '../{repo}').format(repo=repo_name)
+
+    def open_photo_repo(self, repo_name: str) -> git.Repo:
+        """Clone the photo repository, or pull it if the checkout already exists"""
+        repo_dir = self.photo_repo_dir(repo_name)
+        repo_url = self.config.get('photo_repo_url_template', 'https://github.com/{username}/{repo}.git').format(
+            username=self.github_username, repo=repo_name)
         
-        return uploaded_files
+        if os.path.exists(repo_dir):
+            repo = git.Repo(repo_dir)
+            origin = repo.remotes.origin
+            origin.pull()
+            return repo
+        return git.Repo.clone_from(repo_url, repo_dir)
 
+    @tracing.traced
     def clone_or_update_photo_repo(self, repo_name: str) -> str:
         """Clone or update the photo repository locally"""
-        repo_dir = f"../{repo_name}"
-        repo_url = f"https://github.com/{self.github_username}/{repo_name}.git"
+        repo_dir = self.photo_repo_dir(repo_name)
         
         try:
-            if os.path.exists(repo_dir):
-                repo = git.Repo(repo_dir)
-                origin = repo.remotes.origin
-                origin.pull()
-            else:
-                git.Repo.clone_from(repo_url, repo_dir)
+            self.open_photo_repo(repo_name)
             time.sleep(2)
             return repo_dir
             
@@ -232,84 +576,475 @@ class PhotoGalleryAutomator:
                 os.makedirs(repo_dir, exist_ok=True)
             return repo_dir
 
-    def process_photos(self, input_dir: str, date_str: str) -> Tuple[str, List[str]]:
+    def get_checkout_files(self, repo: git.Repo, date_str: str) -> dict:
+        """Get files of a date folder tracked in the local photo repository checkout"""
+        try:
+            folder = repo.head.commit.tree / date_str
+        except (KeyError, ValueError):
+            return {}
+        return {blob.name: blob.hexsha for blob in folder.blobs}
+
+    @tracing.traced
+    def commit_album_to_checkout(self, repo: git.Repo, filenames: List[str], files_to_delete: List[str],
+                                 date_str: str) -> Tuple[List[str], List[str]]:
+        """Stage files already written into the checkout, remove deleted ones, then commit and push once"""
+        branch = self.config.get('photo_repo_branch', 'main')
+        try:
+            if filenames:
+                repo.index.add([f"{date_str}/{filename}" for filename in filenames])
+            if files_to_delete:
+                repo.index.remove([f"{date_str}/{filename}" for filename in files_to_delete], working_tree=True)
+            if not repo.index.diff('HEAD'):
+                return [], []
+            
+            repo.index.commit(f"Update {date_str}: {len(filenames)} added, {len(files_to_delete)} removed")
+            repo.remotes.origin.push(branch).raise_if_error()
+        except Exception as e:
+            print(f"✗ Push to {repo.working_tree_dir} failed: {e}")
+            # Drop the local commit and staged changes so the checkout matches the remote again
+            repo.git.reset('--hard', f'origin/{branch}')
+            return [], []
+        
+        for filename in filenames:
+            print(f"✓ {filename}")
+        return list(filenames), list(files_to_delete)
+
+    def manifest_path(self, date_str: str) -> str:
+        """Path of the per-album sync manifest"""
+        return f"images/{self.current_year}/{date_str}/manifest.json"
+
+    def load_manifest(self, date_str: str) -> dict:
+        """Load the album manifest (empty if the album was never synced with one)"""
+        try:
+            with open(self.manifest_path(date_str), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'files': {}}
+
+    def save_manifest(self, date_str: str, manifest: dict):
+        """Write the album manifest atomically"""
+        path = self.manifest_path(date_str)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def watermark_signature(self) -> str:
+        """Hash of everything that affects the watermarked output besides the source photo"""
+        h = hashlib.sha256(gallery.file_sha256(self.config.get('watermark_logo_path', 'assets/logo.png')).encode())
+        h.update(json.dumps({**WATERMARK_PARAMS, 'margin_bottom': self.config.get('margin_bottom', 30)},
+                            sort_keys=True).encode())
+        return h.hexdigest()
+
+    def journal_path(self, date_str: str) -> str:
+        """Path of the run journal, next to the temp directory of the watermarked copies"""
+        return f"temp_watermarked_{date_str}.journal.json"
+
+    def open_journal(self, date_str: str, resume: bool) -> journal.RunJournal:
+        """Load the journal of an interrupted run when resuming, otherwise start a fresh one"""
+        path = self.journal_path(date_str)
+        key = {'year': self.current_year, 'date': date_str, 'backend': self.config.get('sync_backend', 'contents'),
+               'watermark': self.watermark_signature(), 'single_decode': self.config.get('single_decode', True),
+               'heights': list(self.thumbnail_heights), 'formats': self.thumbnail_formats}
+        run_journal = journal.RunJournal(path, key, resume)
+        if run_journal.resumed:
+            print(f"ℹ Resuming from {path}: {len(run_journal.data['files'])} photos checkpointed")
+        elif os.path.exists(path):
+            reason = "it was written with other settings" if resume else "use --resume to continue it"
+            print(f"ℹ Starting over, ignoring the journal of an interrupted run in {path} ({reason})")
+        return run_journal
+
+    @tracing.traced
+    def diff_album(self, input_dir: str, local_files: set, manifest: dict, pending: set = frozenset()) -> dict:
+        """Classify local photos against the manifest"""
+        signature = self.watermark_signature()
+        entries = manifest['files']
+        diff = {'new': [], 'modified': [], 'renamed': [], 'deleted': [], 'unchanged': [], 'hashes': {}, 'stats': {}}
+        
+        unmatched = []
+        for filename in sorted(local_files):
+            stat = os.stat(os.path.join(input_dir, filename))
+            diff['stats'][filename] = (stat.st_size, stat.st_mtime_ns)
+            entry = entries.get(filename)
+            current = entry is not None and entry.get('watermark') == signature
+            # Only files whose size/mtime changed get hashed
+            if current and (entry.get('size'), entry.get('mtime')) == diff['stats'][filename]:
+                diff['unchanged'].append(filename)
+                continue
+            
+            diff['hashes'][filename] = gallery.file_sha256(os.path.join(input_dir, filename))
+            if current and entry.get('sha256') == diff['hashes'][filename]:
+                diff['unchanged'].append(filename)  # touched but identical
+            elif entry is not None:
+                diff['modified'].append(filename)
+            else:
+                unmatched.append(filename)
+        
+        # A new name whose content matches a vanished entry is a rename; photos still being written (pending)
+        # are neither renamed nor deleted
+        gone = {name: entry for name, entry in entries.items() if name not in local_files and name not in pending}
+        by_hash = {entry['sha256']: name for name, entry in gone.items()
+                   if entry.get('sha256') and entry.get('watermark') == signature}
+        for filename in unmatched:
+            old_name = by_hash.pop(diff['hashes'][filename], None)
+            if old_name:
+                diff['renamed'].append((old_name, filename))
+                del gone[old_name]
+            else:
+                diff['new'].append(filename)
+        diff['deleted'] = sorted(gone)
+        return diff
+
+    @tracing.traced
+    def bootstrap_manifest(self, input_dir: str, local_files: set, existing_files: dict) -> dict:
+        """Seed a manifest from the remote listing: photos already uploaded are taken as current"""
+        signature = self.watermark_signature()
+        files = {}
+        for filename, blob_sha in existing_files.items():
+            entry = {'blob_sha': blob_sha}
+            if filename in local_files:
+                path = os.path.join(input_dir, filename)
+                stat = os.stat(path)
+                entry.update(size=stat.st_size, mtime=stat.st_mtime_ns, sha256=gallery.file_sha256(path), watermark=signature)
+            files[filename] = entry
+        return {'files': files}
+
+    @tracing.traced
+    def find_duplicates(self, input_dir: str, local_files: set, stats: dict, manifest: dict,
+                        preferred: List[str]) -> dict:
+        """Find near-duplicate local photos as {duplicate: (kept, distance)}"""
+        # dHashes are cached in the manifest by size/mtime
+        cache = manifest.setdefault('dhash', {})
+        for filename in [name for name in cache if not os.path.exists(os.path.join(input_dir, name))]:
+            del cache[filename]
+        stale = [filename for filename in sorted(local_files) if cache.get(filename, [None, None])[:2] != list(stats[filename])]
+        
+        def hash_photo(filename):
+            try:
+                return dedupe.dhash(os.path.join(input_dir, filename))
+            except Exception as e:
+                print(f"Error hashing {filename}: {e}")
+                return None
+        
+        # Reduced decodes release the GIL, so threads are enough
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for filename, value in zip(stale, executor.map(hash_photo, stale)):
+                if value is not None:
+                    cache[filename] = [*stats[filename], f"{value:016x}"]
+        
+        hashes = {filename: int(cache[filename][2], 16) for filename in local_files if filename in cache}
+        threshold = self.config.get('dedupe_threshold', dedupe.DEFAULT_THRESHOLD)
+        return dedupe.near_duplicates(hashes, threshold, preferred)
+
+    def rename_local_thumbnails(self, date_str: str, old_filename: str, new_filename: str):
+        """Move the thumbnails of a renamed photo instead of regenerating them"""
+        outputdir = f"images/{self.current_year}/{date_str}/"
+        old_paths = self.thumbnail_paths(outputdir, os.path.splitext(old_filename)[0])
+        new_paths = self.thumbnail_paths(outputdir, os.path.splitext(new_filename)[0])
+        for old_path, new_path in zip(old_paths, new_paths):
+            if os.path.exists(old_path):
+                os.replace(old_path, new_path)
+        
+        index = gallery.load_index(outputdir)
+        if old_filename in index:
+            index[new_filename] = index.pop(old_filename)
+            gallery.save_index(outputdir, index)
+
+    @tracing.traced
+    def process_photos(self, input_dir: str, date_str: str, run_journal: journal.RunJournal = None,
+                       pending: set = frozenset(), cover_image: str = None) -> Tuple[str, List[str]]:
         """Process photos: sync GitHub repo to match local directory"""
+        # Every photo is checkpointed in run_journal (kept in memory only when none is given)
+        run_journal = run_journal or journal.RunJournal(None, None)
         photo_repo = self.config.get('photo_repo_template', 'RocknBirra-Foto{year}').format(year=self.current_year)
+        sync_backend = self.config.get('sync_backend', 'contents')
+        
+        # Get local files, leaving the ones still being written (pending) for a later run
+        image_extensions = ('.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG')
+        local_files = set(f for f in os.listdir(input_dir) if f.lower().endswith(image_extensions) and f not in pending)
+        print(f"Local files: {len(local_files)}" + (f" ({len(pending)} still being written)" if pending else ""))
         
-        self.create_github_repo(photo_repo)
+        manifest = self.load_manifest(date_str)
+        repo = None
+        if not manifest['files']:
+            # First sync with a manifest: list the remote once to learn what is already there
+            if sync_backend == 'git':
+                if self.github_token:
+                    self.create_github_repo(photo_repo)
+                repo = self.open_photo_repo(photo_repo)
+                existing_files = self.get_checkout_files(repo, date_str)
+            else:
+                self.create_github_repo(photo_repo)
+                existing_files = self.get_existing_files(photo_repo, date_str)
+            print(f"Existing files in photo repo: {len(existing_files)}")
+            manifest = self.bootstrap_manifest(input_dir, local_files, existing_files)
         
-        # Get existing files in GitHub (with SHA for deletion)
-        existing_files = self.get_existing_files(photo_repo, date_str)
-        print(f"Existing files in GitHub: {len(existing_files)}")
+        diff = self.diff_album(input_dir, local_files, manifest, pending)
+        print(f"Unchanged: {len(diff['unchanged'])}, new: {len(diff['new'])}, modified: {len(diff['modified'])}, "
+              f"renamed: {len(diff['renamed'])}, deleted: {len(diff['deleted'])}")
         
-        # Get local files
-        image_extensions = ('.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG')
-        local_files = set(f for f in os.listdir(input_dir) if f.lower().endswith(image_extensions))
-        print(f"Local files: {len(local_files)}")
+        # Near-duplicate frames are reported, and with 'skip' new ones stay out of the album, before any expensive work
+        if self.dedupe_mode:
+            # Keep the cover, then photos already on GitHub, then the earliest frame
+            preferred = ([cover_image] if cover_image else []) + sorted(manifest['files'])
+            duplicates = self.find_duplicates(input_dir, local_files, diff['stats'], manifest, preferred)
+            skipped = {filename for filename in duplicates if filename in diff['new']} if self.dedupe_mode == 'skip' else set()
+            if duplicates:
+                print(f"ℹ Near-duplicates: {len(duplicates)}" + (f", {len(skipped)} skipped" if skipped else ""))
+                for filename, (kept, distance) in sorted(duplicates.items()):
+                    status = "skipped" if filename in skipped else "already uploaded" if filename in manifest['files'] else "flagged"
+                    print(f"  {filename} ≈ {kept} ({distance} bits differ) - {status}")
+            diff['new'] = [filename for filename in diff['new'] if filename not in skipped]
+            local_files -= skipped
         
-        # Files to delete (in GitHub but not in local)
-        files_to_delete = set(existing_files.keys()) - local_files
+        # Refresh stat info of touched-but-identical files so the next run skips hashing them
+        for filename in diff['unchanged']:
+            manifest['files'][filename]['size'], manifest['files'][filename]['mtime'] = diff['stats'][filename]
+        
+        # git and git-data can point a renamed photo at its existing blob; contents has to re-upload it
+        reused = {}
+        files_to_upload_names = diff['new'] + diff['modified']
+        if sync_backend in ('git', 'git-data'):
+            reused = {new_name: old_name for old_name, new_name in diff['renamed']}
+        else:
+            files_to_upload_names += [new_name for _, new_name in diff['renamed']]
+        files_to_delete = sorted(diff['deleted'] + [old_name for old_name, _ in diff['renamed']])
         
-        # Files to upload (in local but not in GitHub)
-        files_to_upload_names = local_files - set(existing_files.keys())
+        # Skip what an interrupted run already uploaded or removed
+        stats = diff['stats']
+        resumed_uploads = [filename for filename in files_to_upload_names + sorted(reused)
+                           if run_journal.done(filename, 'uploaded', stats[filename])]
+        resumed_deletes = [filename for filename in files_to_delete if run_journal.done(filename, 'deleted')]
+        files_to_upload_names = [filename for filename in files_to_upload_names if filename not in resumed_uploads]
+        reused = {new_name: old_name for new_name, old_name in reused.items() if new_name not in resumed_uploads}
+        files_to_delete = [filename for filename in files_to_delete if filename not in resumed_deletes]
+        if resumed_uploads or resumed_deletes:
+            print(f"ℹ Already done by the interrupted run: {len(resumed_uploads)} uploads, {len(resumed_deletes)} deletions")
         
         print(f"Files to delete: {len(files_to_delete)}")
         print(f"Files to upload: {len(files_to_upload_names)}")
         
-        # Delete files that are no longer local
-        deleted_files = []
-        for filename in files_to_delete:
-            if self.delete_file_from_github(photo_repo, date_str, filename, existing_files[filename]):
+        if not files_to_upload_names and not files_to_delete and not reused and not resumed_uploads and not resumed_deletes:
+            self.save_manifest(date_str, manifest)
+            if run_journal.resumed and self.config.get('single_decode', True):
+                # Photos the interrupted run published before the manifest was saved now look unchanged
+                temp_dir = (os.path.join(self.photo_repo_dir(photo_repo), date_str) if sync_backend == 'git'
+                            else f"temp_watermarked_{date_str}")
+                self.index_thumbnails(date_str, temp_dir, self.resumed_published(date_str, temp_dir, run_journal,
+                                                                                 local_files, stats, manifest))
+                if sync_backend != 'git' and os.path.isdir(temp_dir):
+                    shutil.rmtree(temp_dir)
+            print("ℹ Album unchanged - nothing to sync")
+            return photo_repo, sorted(local_files)
+        
+        if sync_backend == 'git' and repo is None:
+            repo = self.open_photo_repo(photo_repo)
+        
+        # Delete files that are no longer local (git and git-data commit deletions together with the uploads)
+        deleted_files = list(resumed_deletes)
+        for filename in (files_to_delete if sync_backend == 'contents' else []):
+            if self.delete_file_from_github(photo_repo, date_str, filename, manifest['files'][filename].get('blob_sha')):
                 deleted_files.append(filename)
+                run_journal.mark(filename, 'deleted')
                 self.delete_local_thumbnails(date_str, filename)
                 print(f"✗ Deleted: {filename}")
         
         # Process and upload new files
-        temp_dir = f"temp_watermarked_{date_str}"
+        if sync_backend == 'git':
+            temp_dir = os.path.join(repo.working_tree_dir, date_str)
+        else:
+            temp_dir = f"temp_watermarked_{date_str}"
         os.makedirs(temp_dir, exist_ok=True)
         
+        # Reuse the blobs and watermarked copies of an interrupted run; sorted so uploads happen in a stable order
         files_to_upload = []
-        for filename in files_to_upload_names:
-            input_path = os.path.join(input_dir, filename)
+        resumed_blobs = []
+        to_watermark = []
+        for filename in sorted(files_to_upload_names):
             watermarked_path = os.path.join(temp_dir, filename)
-            
-            if self.add_watermark(input_path, watermarked_path):
+            if sync_backend == 'git-data' and run_journal.done(filename, 'blob', stats[filename]):
+                resumed_blobs.append((filename, run_journal.entry(filename)['blob_sha']))
+            elif run_journal.done(filename, 'watermarked', stats[filename]) and os.path.exists(watermarked_path):
                 files_to_upload.append((watermarked_path, filename))
+            else:
+                to_watermark.append((os.path.join(input_dir, filename), watermarked_path))
+        if to_watermark:
+            print(f"Watermarking {len(to_watermark)} files with {min(self.jobs, len(to_watermark))} jobs...")
+        
+        # Modified photos get fresh thumbnails
+        for source_path, _ in to_watermark:
+            if os.path.basename(source_path) in diff['modified']:
+                self.delete_local_thumbnails(date_str, os.path.basename(source_path))
+        
+        # Thumbnails come out of the same decode as the watermark
+        thumbnail_dir = f"images/{self.current_year}/{date_str}/" if self.config.get('single_decode', True) else None
+        watermarked = self.watermark_photos(
+            to_watermark, thumbnail_dir,
+            on_done=lambda src, dst: run_journal.mark(os.path.basename(dst), 'watermarked', stats[os.path.basename(dst)]))
+        files_to_upload = sorted(files_to_upload + [(dst, os.path.basename(dst)) for _, dst in watermarked],
+                                 key=lambda item: item[1])
+        
+        def checkpoint_upload(filename):
+            if filename in reused:
+                blob_sha = manifest['files'][reused[filename]]['blob_sha']
+            elif run_journal.done(filename, 'blob', stats[filename]):
+                blob_sha = run_journal.entry(filename)['blob_sha']
+            else:
+                blob_sha = git_blob_sha(os.path.join(temp_dir, filename))
+            run_journal.mark(filename, 'uploaded', stats[filename], blob_sha=blob_sha)
         
         uploaded_files = []
-        if files_to_upload:
+        if sync_backend in ('git', 'git-data'):
+            print(f"Committing {len(files_to_upload) + len(reused)} uploads and {len(files_to_delete)} deletions...")
+            if sync_backend == 'git':
+                for new_name, old_name in reused.items():
+                    shutil.copy2(os.path.join(temp_dir, old_name), os.path.join(temp_dir, new_name))
+                uploaded_files, deleted_files = self.commit_album_to_checkout(
+                    repo, [filename for _, filename in files_to_upload] + sorted(reused), files_to_delete, date_str)
+            else:
+                uploaded_files, deleted_files = self.commit_album_to_github(
+                    files_to_upload, files_to_delete, photo_repo, date_str,
+                    [(new_name, manifest['files'][old_name]['blob_sha']) for new_name, old_name in sorted(reused.items())]
+                    + resumed_blobs,
+                    on_blob=lambda filename, sha: run_journal.mark(filename, 'blob', stats[filename], blob_sha=sha))
+            for filename in uploaded_files:
+                checkpoint_upload(filename)
+            for filename in deleted_files:
+                run_journal.mark(filename, 'deleted')
+            deleted_files += resumed_deletes
+            for new_name, old_name in reused.items():
+                if new_name in uploaded_files:
+                    self.rename_local_thumbnails(date_str, old_name, new_name)
+            for filename in deleted_files:
+                self.delete_local_thumbnails(date_str, filename)
+                print(f"✗ Deleted: {filename}")
+        elif files_to_upload:
             print(f"Uploading {len(files_to_upload)} files...")
-            uploaded_files = self.batch_upload_to_github(files_to_upload, photo_repo, date_str)
+            existing_shas = {filename: manifest['files'][filename].get('blob_sha') for filename in diff['modified']}
+            uploaded_files = self.batch_upload_to_github(files_to_upload, photo_repo, date_str, existing_shas,
+                                                         on_uploaded=checkpoint_upload)
+        uploaded_files += resumed_uploads
+        
+        # Drop thumbnails of files that never made it to GitHub
+        if thumbnail_dir:
+            for _, filename in files_to_upload:
+                if filename not in uploaded_files:
+                    self.delete_local_thumbnails(date_str, filename)
+            # Index them against the watermarked copies that were published, so gallery.py can build the pages
+            # from the index alone and a later run over the photo repo finds them current; with those an interrupted
+            # run published (reused blobs, uploads the manifest never recorded)
+            published = [filename for _, filename in files_to_upload if filename in uploaded_files]
+            self.index_thumbnails(date_str, temp_dir, published + [
+                filename for filename in self.resumed_published(date_str, temp_dir, run_journal, local_files, stats,
+                                                                manifest) if filename not in published])
         
-        # Clean up temp directory
-        shutil.rmtree(temp_dir)
+        # Record what is on GitHub now
+        signature = self.watermark_signature()
+        for filename in uploaded_files:
+            size, mtime = diff['stats'][filename]
+            manifest['files'][filename] = {'size': size, 'mtime': mtime, 'sha256': diff['hashes'][filename],
+                                           'watermark': signature, 'blob_sha': run_journal.entry(filename)['blob_sha']}
+        for filename in deleted_files:
+            manifest['files'].pop(filename, None)
+        self.save_manifest(date_str, manifest)
+        
+        # Clean up temp directory (the git backend wrote into the checkout itself)
+        if sync_backend != 'git':
+            shutil.rmtree(temp_dir)
         
         # Final file list (what should be in GitHub now)
-        final_files = list(local_files)
+        final_files = sorted(local_files)
         
         print(f"Sync complete: {len(deleted_files)} deleted, {len(uploaded_files)} uploaded")
         print(f"Total files in repo: {len(final_files)}")
         
         return photo_repo, final_files
 
-    def run_gallery_script(self, date_str: str, title: str, photo_repo: str) -> bool:
+    def resumed_published(self, date_str: str, temp_dir: str, run_journal: journal.RunJournal, local_files: set,
+                          stats: dict, manifest: dict) -> List[str]:
+        """Unindexed photos an interrupted run published from temp_dir"""
+        index = gallery.load_index(f"images/{self.current_year}/{date_str}/")
+        published = []
+        # Watermarked (with thumbnails) by the journal, and the copy in temp_dir is the one on the photo repo
+        for filename in sorted(local_files):
+            path = os.path.join(temp_dir, filename)
+            if (filename in index or not run_journal.done(filename, 'watermarked', stats[filename])
+                    or not os.path.exists(path)):
+                continue
+            # Uploads after the last checkpoint only show in the remote listing the manifest was seeded from
+            blob_sha = manifest['files'].get(filename, {}).get('blob_sha')
+            if run_journal.done(filename, 'uploaded', stats[filename]) or blob_sha == git_blob_sha(path):
+                published.append(filename)
+        return published
+
+    def index_thumbnails(self, date_str: str, temp_dir: str, published: List[str]):
+        """Index the thumbnails written while watermarking"""
+        if not published:
+            return
+        outputdir = f"images/{self.current_year}/{date_str}/"
+        index = gallery.load_index(outputdir)
+        # Keyed to the published (watermarked) copies in temp_dir, never to the originals
+        for filename in published:
+            try:
+                index[filename] = gallery.published_entry(os.path.join(temp_dir, filename), outputdir,
+                                                          self.thumbnail_heights, self.thumbnail_formats)
+            except OSError as e:
+                # Left out of the index: gallery.py then renders it from the photo repo copy
+                print(f"✗ Error indexing thumbnails of {filename}: {e}")
+                index.pop(filename, None)
+        gallery.save_index(outputdir, index)
+
+    def has_synced_files(self, imagedir: str, filenames: List[str]) -> bool:
+        """Check that a photo repo directory holds every synced file"""
+        if not os.path.isdir(imagedir):
+            return False
+        present = set(os.listdir(imagedir))
+        # Without a file list, any photo will do
+        if filenames:
+            return present.issuperset(filenames)
+        return any(f.lower().endswith(('.jpg', '.jpeg', '.png')) for f in present)
+
+    @tracing.traced
+    def run_gallery_script(self, date_str: str, title: str, photo_repo: str, input_dir: str = None,
+                           local_files: List[str] = None) -> bool:
         """Run the gallery.py script"""
-        repo_dir = self.clone_or_update_photo_repo(photo_repo)
+        # local_files: the photos just synced, by default everything in input_dir
+        only_files = local_files
+        if local_files is None:
+            local_files = []
+            if input_dir:
+                local_files = [f for f in os.listdir(input_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
         
-        for attempt in range(3):
+        # gallery.py only ever sees the watermarked copies: thumbnails made from the originals would be published
+        # without the logo
+        from_index = bool(local_files) and self.has_local_thumbnails(date_str, local_files)
+        if from_index:
+            # Thumbnails were written and indexed during watermarking: no need to pull the photos back down
+            imagedir = f"images/{self.current_year}/{date_str}/"
+        elif self.config.get('sync_backend', 'contents') == 'git':
+            # The checkout already holds exactly what was pushed
+            imagedir = os.path.join(self.photo_repo_dir(photo_repo), date_str)
+        else:
+            repo_dir = self.clone_or_update_photo_repo(photo_repo)
             imagedir = os.path.join(repo_dir, date_str)
-            if os.path.exists(imagedir):
-                image_files = [f for f in os.listdir(imagedir) 
-                             if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-                if image_files:
+            
+            for attempt in range(3):
+                if self.has_synced_files(imagedir, local_files):
                     break
-            time.sleep(2)
-            try:
-                repo = git.Repo(repo_dir)
-                origin = repo.remotes.origin
-                origin.pull()
-            except:
-                pass
+                with tracing.span('wait_for_photo_repo', attempt=attempt):
+                    time.sleep(2)
+                    try:
+                        repo = git.Repo(repo_dir)
+                        origin = repo.remotes.origin
+                        origin.pull()
+                    except:
+                        pass
+        
+        # A clone or checkout missing synced photos (e.g. a failed pull) would publish the album without them
+        if not from_index and not self.has_synced_files(imagedir, local_files):
+            print(f"✗ {imagedir} lacks photos that were synced - gallery not regenerated")
+            return False
         
         gallery_script = self.config.get('gallery_script_path', 'scripts/gallery.py')
         outputdir = f"images/{self.current_year}/{date_str}/"
@@ -318,6 +1053,15 @@ class PhotoGalleryAutomator:
         print(f"Running gallery script: {gallery_script} with output to {outputdir}...")
         
         cmd = ['python3', gallery_script, imagedir, outputdir, title, repo_url]
+        if from_index:
+            cmd.append('--from-index')
+        if self.config.get('fast_thumbnails', False):
+            cmd.append('--fast-thumbnails')
+        cmd += ['--heights', *map(str, self.thumbnail_heights)]
+        cmd += ['--formats', *(f"{ext}:{quality}" for ext, quality in self.thumbnail_formats.items())]
+        if only_files:
+            # Photos that arrived after the sync started are left for the next run
+            cmd += ['--files', *only_files]
         result = subprocess.run(cmd, capture_output=True, text=True)
         
         if result.returncode == 0:
@@ -327,81 +1071,109 @@ class PhotoGalleryAutomator:
             print(f"✗ Gallery failed: {result.stderr}")
             return False
 
-    def check_photos_html_entry_exists(self, date_str: str, title: str) -> bool:
-        """Check if Photos.html already contains an entry for this date/title"""
-        photos_html_path = self.config.get('photos_html_path', 'Photos.html')
-        
-        try:
-            with open(photos_html_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Check if an entry with this date already exists
-            entry_pattern = f"images/{self.current_year}/{date_str}/gallery.html"
-            return entry_pattern in content
-        except FileNotFoundError:
-            return False
+    def load_catalog(self) -> dict:
+        """Load albums.json, importing it from photos.html the first time"""
+        catalog_path = self.config.get('catalog_path', catalog.CATALOG)
+        photos_html_path = self.config.get('photos_html_path', catalog.PHOTOS_HTML)
+        if not os.path.exists(catalog_path) and os.path.exists(photos_html_path):
+            imported = catalog.import_photos_html(photos_html_path)
+            print(f"ℹ Imported {len(imported['albums'])} albums from {photos_html_path} into {catalog_path}")
+            return imported
+        return catalog.load_catalog(catalog_path)
 
+    @tracing.traced
     def update_photos_html(self, date_str: str, title: str, cover_image: str) -> bool:
-        """Update Photos.html with new gallery entry (only if not already present)"""
-        if self.check_photos_html_entry_exists(date_str, title):
-            print("ℹ Photos.html entry already exists - skipping update")
-            return True
+        """Record the album in albums.json and regenerate photos.html if the catalog changed"""
+        album_catalog = self.load_catalog()
+        photos = catalog.count_photos(self.current_year, date_str)
+        cover = os.path.splitext(cover_image)[0]
+        catalog.set_album(album_catalog, self.current_year, date_str, title, cover, photos,
+                          gallery.fallback_height(self.thumbnail_heights))
         
-        photos_html_path = self.config.get('photos_html_path', 'Photos.html')
-        
-        with open(photos_html_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Convert cover image to .webp extension
-        cover_image_base = os.path.splitext(cover_image)[0]
-        cover_image_webp = f"{cover_image_base}.webp"
-        
-        formatted_date = date_str.replace('-', '/')
-        new_entry = f'''<div class="home-buttons">
-            <div class="card">
-                <a class="albums" href="images/{self.current_year}/{date_str}/gallery.html" style="--background-image-url: url(images/{self.current_year}/{date_str}/406px/{cover_image_webp});">
-                    <h2 class="album-title">{formatted_date} <Br> {title} </h2>
-                </a>
-            </div>
-        </div>'''
-        
-        # Find where to insert: after the comment for current year or at the start of container
-        year_comment = f"<!-- {self.current_year} -->"
-        if year_comment in content:
-            # Insert after the year comment
-            insert_pos = content.find(year_comment) + len(year_comment)
-            content = content[:insert_pos] + '\n        ' + new_entry + content[insert_pos:]
+        photos_html_path = self.config.get('photos_html_path', catalog.PHOTOS_HTML)
+        catalog_path = self.config.get('catalog_path', catalog.CATALOG)
+        if catalog.build_photos_html(album_catalog, photos_html_path, catalog_path):
+            print(f"✓ {photos_html_path} updated")
         else:
-            # Find the container div and insert at the beginning
-            container_start = content.find('<div class="container">') + len('<div class="container">')
-            year_comment_new = f"\n        <!-- {self.current_year} -->"
-            content = content[:container_start] + year_comment_new + '\n        ' + new_entry + content[container_start:]
-        
-        with open(photos_html_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print("✓ Photos.html updated")
+            print(f"ℹ {photos_html_path} entry already up to date - skipping update")
         return True
 
-    def run_automation(self, input_dir: str, date_str: str, title: str, cover_image: str):
+    @tracing.traced
+    def run_automation(self, input_dir: str, date_str: str, title: str, cover_image: str, resume: bool = False,
+                       pending: set = frozenset(), allow_empty: bool = False):
         """Run the complete automation workflow"""
         print(f"Starting: {date_str} - {title}")
         
-        photo_repo, all_files = self.process_photos(input_dir, date_str)
+        # resume picks up the journal of an interrupted run; pending files are still being written (watch mode)
+        run_journal = self.open_journal(date_str, resume)
+        try:
+            photo_repo, all_files = self.process_photos(input_dir, date_str, run_journal, pending, cover_image)
+        finally:
+            # Also when interrupted: the checkpoints since the last periodic save are kept
+            run_journal.save(force=True)
         
         if not all_files:
             print("No files available")
-            return False
+            # Watch mode: an emptied inbox is a synced state, not a failure to retry
+            return allow_empty
         
-        if not self.run_gallery_script(date_str, title, photo_repo):
+        if run_journal.album_done('gallery'):
+            print("ℹ Gallery already generated by the interrupted run - skipping")
+        elif self.run_gallery_script(date_str, title, photo_repo, input_dir, all_files):
+            run_journal.mark_album('gallery')
+        else:
             return False
         
         if not self.update_photos_html(date_str, title, cover_image):
             return False
         
+        run_journal.discard()
         print(f"✅ Complete: {date_str}")
         return True
 
+    def watch(self, input_dir: str, date_str: str, title: str, cover_image: str,
+              stop: threading.Event = None) -> bool:
+        """Keep the album in sync with input_dir as photos arrive"""
+        settle = self.config.get('watch_settle', 2.0)
+        poll_interval = self.config.get('watch_poll_interval', 1.0)
+        debouncer = watching.Debouncer(settle, self.config.get('watch_max_wait', 30.0))
+        watcher = watching.DirectoryWatcher(input_dir, self.config.get('watch_events', True))
+        stop = stop or threading.Event()
+        print(f"ℹ Watching {input_dir} ({watcher.mode}) - Ctrl+C to stop")
+        
+        # One run_automation per batch, until Ctrl+C or stop is set
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                debouncer.update(watching.snapshot(input_dir), now)
+                batch = debouncer.batch(now)
+                if batch is None:
+                    watcher.wait(debouncer.next_check(now, poll_interval))
+                    continue
+                
+                # Photos still being written wait for the next batch; the manifest keeps runs incremental
+                ready, pending = batch
+                print(f"\nℹ Batch of {len(ready)} changed photos" + (f", {len(pending)} still being written" if pending else ""))
+                try:
+                    with tracing.span('watch_batch', photos=len(ready), pending=len(pending)):
+                        success = self.run_automation(input_dir, date_str, title, cover_image, resume=True,
+                                                      pending=pending, allow_empty=True)
+                except Exception as e:
+                    # A failed batch (GitHub unreachable, broken checkout...) must not end the watch
+                    print(f"✗ Batch error: {e}")
+                    success = False
+                if success:
+                    debouncer.done(ready)
+                else:
+                    retry_delay = self.config.get('watch_retry_delay', 30.0)
+                    print(f"✗ Batch failed, retrying in {retry_delay:.0f}s")
+                    debouncer.retry_after(retry_delay, time.monotonic())
+        except KeyboardInterrupt:
+            print("\nℹ Stopped watching")
+        finally:
+            watcher.close()
+        return True
+
 
 def main():
     parser = argparse.ArgumentParser(description='Automate photo gallery workflow')
@@ -410,11 +1182,38 @@ def main():
     parser.add_argument('title', help='Gallery title')
     parser.add_argument('cover_image', help='Filename for cover image (will be converted to .webp)')
     parser.add_argument('--config', default='config.json', help='Configuration file path')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Number of watermarking processes (default: CPU count)')
+    parser.add_argument('--max-memory', type=int, metavar='MB', default=None,
+                        help='Memory budget for watermarking: photos are admitted by estimated decoded size')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run from its journal instead of starting over')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and sync photos as they are copied into input_dir')
+    parser.add_argument('--dedupe', choices=['flag', 'skip'], default=None,
+                        help='Report near-duplicate photos (burst frames), or also leave the new ones out of the album')
+    parser.add_argument('--profile', metavar='TRACE_JSON',
+                        help='Write a Chrome trace of every stage (workers and gallery.py included) and print a summary')
+    parser.add_argument('--cprofile', metavar='PSTATS',
+                        help='With --profile, also cProfile the image stages and write the merged stats here')
     
     args = parser.parse_args()
     
-    automator = PhotoGalleryAutomator(args.config)
-    success = automator.run_automation(args.input_dir, args.date, args.title, args.cover_image)
+    if args.profile:
+        tracing.enable(cprofile=bool(args.cprofile))
+    
+    automator = PhotoGalleryAutomator(args.config, jobs=args.jobs, max_memory=args.max_memory, dedupe_mode=args.dedupe)
+    if args.watch:
+        success = automator.watch(args.input_dir, args.date, args.title, args.cover_image)
+    else:
+        success = automator.run_automation(args.input_dir, args.date, args.title, args.cover_image, args.resume)
+    
+    if args.profile:
+        events = tracing.collect(args.profile, args.cprofile)
+        print(tracing.summary(events))
+        print(f"ℹ Trace written to {args.profile} (open in chrome://tracing or ui.perfetto.dev)")
+        if args.cprofile:
+            print(f"ℹ cProfile stats written to {args.cprofile} (python3 -m pstats {args.cprofile})")
     
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Estimate time-to-first-layout of every gallery under images/ before and after
+inline placeholders
+
+With waitThumbnailsLoad: true justifiedGallery lays nothing out until every
+<img> has loaded, so first layout waited for gallery.html plus all its 406px
+tiles. With width/height attributes and inline placeholders it only needs
+gallery.html itself. There is no browser here, so both are modelled from the
+bytes on disk over a link of the given bandwidth and round-trip time:
+
+    time = rtt * (1 + ceil(tiles / connections)) + bytes / bandwidth
+
+The real number is logged by gallery.js ("Time to first layout") and marked as
+gallery-first-layout in the DevTools performance panel.
+
+    python3 benchmarks/bench_first_layout.py --mbps 8 --rtt 0.1
+"""
+
+import os
+import sys
+import glob
+import math
+import time
+import logging
+import argparse
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import gallery
+from bench_regenerate import index_from_thumbnails
+
+
+def layout_seconds(html_bytes: int, tile_bytes: int, tiles: int, args) -> float:
+    round_trips = 1 + (math.ceil(tiles / args.connections) if tiles else 0)
+    return args.rtt * round_trips + (html_bytes + tile_bytes) / (args.mbps * 1e6 / 8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model time-to-first-layout with and without placeholders')
+    parser.add_argument('--images', default=os.path.join(REPO_ROOT, 'images'), help='Root of the albums')
+    parser.add_argument('--mbps', type=float, default=8.0, help='Link bandwidth in Mbit/s (crowded 4G)')
+    parser.add_argument('--rtt', type=float, default=0.1, help='Round-trip time in seconds')
+    parser.add_argument('--connections', type=int, default=6, help='Parallel connections per host')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'album':16} {'photos':>6} {'before':>8} {'after':>8} {'html +KiB':>9}")
+    totals = {'before': 0.0, 'after': 0.0, 'photos': 0, 'placeholders': 0.0}
+    with tempfile.TemporaryDirectory() as workdir:
+        for html_path in sorted(glob.glob(os.path.join(args.images, '*', '*', 'gallery.html'))):
+            albumdir = os.path.dirname(html_path)
+            name = os.path.relpath(albumdir, args.images)
+            title, repo_url, filenames = gallery.parse_gallery_html(html_path)
+            tiles = {filename: os.path.join(albumdir, '406px', f"{os.path.splitext(filename)[0]}.webp")
+                     for filename in filenames}
+            tiles = {filename: path for filename, path in tiles.items() if os.path.exists(path) and os.path.getsize(path)}
+            tile_paths = list(tiles.values())
+
+            index = index_from_thumbnails(albumdir, filenames)
+            start = time.perf_counter()
+            for filename, tile_path in tiles.items():
+                index[filename]['lqip'] = gallery.placeholder(tile_path)
+            totals['placeholders'] += time.perf_counter() - start
+
+            outputdir = os.path.join(workdir, name)
+            os.makedirs(outputdir)
+            gallery.save_index(outputdir, index)
+            gallery.generate_html(albumdir, outputdir, title, repo_url, from_index=True)
+
+            old_html = os.path.getsize(html_path)
+            new_html = os.path.getsize(os.path.join(outputdir, 'gallery.html'))
+            before = layout_seconds(old_html, sum(map(os.path.getsize, tile_paths)), len(tile_paths), args)
+            after = layout_seconds(new_html, 0, 0, args)
+            print(f"{name:16} {len(filenames):6} {before:7.2f}s {after:7.2f}s {(new_html - old_html) / 1024:9.1f}")
+            totals['before'] += before
+            totals['after'] += after
+            totals['photos'] += len(filenames)
+
+    print(f"total: {totals['photos']} photos, first layout {totals['before']:.1f}s -> {totals['after']:.1f}s "
+          f"summed over albums ({args.mbps} Mbit/s, {args.rtt * 1000:.0f} ms RTT)")
+    print(f"placeholders: {totals['placeholders'] / max(totals['photos'], 1) * 1000:.2f} ms/photo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark regenerating every gallery.html under images/ from the thumbnail index
+
+The repository only holds thumbnails, so the index for each album is first built
+from the existing 768px/406px WebP headers (not timed). The script then times
+reading every thumbnail header -- the least the pre-index code had to do, which
+actually reopened each full-size original -- against generate_html(from_index=True),
+which touches no image bytes.
+
+    python3 benchmarks/bench_regenerate.py
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import tempfile
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import gallery
+
+# Thumbnail heights committed under images/ (WebP only)
+COMMITTED_HEIGHTS = (768, 406)
+
+def thumbnail_aspect(albumdir: str, filename: str) -> float:
+    """Aspect ratio from the first readable thumbnail of a photo"""
+    for height in COMMITTED_HEIGHTS:
+        try:
+            with Image.open(os.path.join(albumdir, f"{height}px", f"{os.path.splitext(filename)[0]}.webp")) as thumbnail:
+                return thumbnail.width / thumbnail.height
+        except (OSError, ValueError):
+            print(f"warning: unreadable thumbnail {albumdir}/{height}px for {filename}")
+    return 1.0
+
+
+def index_from_thumbnails(albumdir: str, filenames: list) -> dict:
+    """Build index entries (sizes only) from the album's existing thumbnails"""
+    index = {}
+    for filename in filenames:
+        aspect_ratio = thumbnail_aspect(albumdir, filename)
+        index[filename] = {'size': None, 'mtime': None,
+                           **{str(height): [int(aspect_ratio * height), height] for height in COMMITTED_HEIGHTS}}
+    return index
+
+
+def read_headers(albumdir: str, filenames: list):
+    for filename in filenames:
+        for height in COMMITTED_HEIGHTS:
+            try:
+                with Image.open(os.path.join(albumdir, f"{height}px", f"{os.path.splitext(filename)[0]}.webp")) as thumbnail:
+                    thumbnail.size
+            except (OSError, ValueError):
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark gallery regeneration from the thumbnail index')
+    parser.add_argument('--images', default=os.path.join(REPO_ROOT, 'images'), help='Root of the albums')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    totals = {'albums': 0, 'photos': 0, 'headers': 0.0, 'index': 0.0}
+    with tempfile.TemporaryDirectory() as workdir:
+        for year_dir in sorted(glob.glob(os.path.join(args.images, '*'))):
+            year = {'albums': 0, 'photos': 0, 'headers': 0.0, 'index': 0.0}
+            for albumdir in sorted(glob.glob(os.path.join(year_dir, '*', 'gallery.html'))):
+                albumdir = os.path.dirname(albumdir)
+                title, repo_url, filenames = gallery.parse_gallery_html(os.path.join(albumdir, 'gallery.html'))
+                outputdir = os.path.join(workdir, os.path.relpath(albumdir, args.images))
+                os.makedirs(outputdir)
+                gallery.save_index(outputdir, index_from_thumbnails(albumdir, filenames))
+
+                start = time.perf_counter()
+                read_headers(albumdir, filenames)
+                year['headers'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                gallery.generate_html(albumdir, outputdir, title, repo_url, from_index=True)
+                year['index'] += time.perf_counter() - start
+
+                year['albums'] += 1
+                year['photos'] += len(filenames)
+            print(f"{os.path.basename(year_dir)}: {year['albums']:2} albums {year['photos']:5} photos  "
+                  f"thumbnail headers {year['headers'] * 1000:8.1f} ms  index {year['index'] * 1000:8.1f} ms")
+            for key in totals:
+                totals[key] += year[key]
+
+    print(f"total: {totals['albums']:2} albums {totals['photos']:5} photos  "
+          f"thumbnail headers {totals['headers'] * 1000:8.1f} ms  index {totals['index'] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark create_thumbnail in default and fast (draft decode) mode
+
+Each mode runs in its own process so peak RSS can be reported, then the
+fast thumbnails are compared pixel by pixel against the default ones.
+
+    python3 benchmarks/bench_thumbnail.py --count 10 --megapixels 24
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from PIL import Image, ImageChops, ImageStat
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+from synthetic import generate_album
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (VmHWM, so the parent's pages before exec don't count)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(input_dir: str, output_dir: str, fast: bool):
+    """Create every thumbnail of the album and print timing and peak RSS as JSON"""
+    import gallery
+
+    filenames = sorted(os.listdir(input_dir))
+    start = time.perf_counter()
+    for height in gallery.THUMBNAIL_HEIGHTS:
+        thumbdir = os.path.join(output_dir, f"{height}px")
+        os.makedirs(thumbdir, exist_ok=True)
+        for filename in filenames:
+            gallery.create_thumbnail(os.path.join(input_dir, filename), thumbdir, height, {'webp': 85}, fast=fast)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'seconds_per_thumbnail': elapsed / (len(filenames) * len(gallery.THUMBNAIL_HEIGHTS)),
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def measure(input_dir: str, output_dir: str, fast: bool) -> dict:
+    """Run one mode in a fresh interpreter"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--run-mode', 'fast' if fast else 'default',
+           '--input', input_dir, '--output', output_dir]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(default_dir: str, fast_dir: str) -> float:
+    """Return the worst mean absolute pixel difference (0-255) across all thumbnails"""
+    worst = 0.0
+    for root, _, files in os.walk(default_dir):
+        for filename in files:
+            reference_path = os.path.join(root, filename)
+            candidate_path = os.path.join(fast_dir, os.path.relpath(reference_path, default_dir))
+            with Image.open(reference_path) as reference, Image.open(candidate_path) as candidate:
+                if reference.size != candidate.size:
+                    candidate = candidate.resize(reference.size, Image.LANCZOS)
+                diff = ImageChops.difference(reference.convert('RGB'), candidate.convert('RGB'))
+                worst = max(worst, max(ImageStat.Stat(diff).mean))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thumbnail generation')
+    parser.add_argument('--count', type=int, default=10, help='Photos in the synthetic album')
+    parser.add_argument('--megapixels', type=float, default=24.0, help='Photo resolution')
+    parser.add_argument('--tolerance', type=float, default=4.0,
+                        help='Maximum mean absolute pixel difference allowed for fast mode')
+    parser.add_argument('--run-mode', choices=['default', 'fast'], help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.input, args.output, args.run_mode == 'fast')
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_dir = os.path.join(workdir, 'album')
+        print(f"Generating {args.count} photos at {args.megapixels} MP...")
+        generate_album(input_dir, args.count, args.megapixels)
+
+        default = measure(input_dir, os.path.join(workdir, 'default'), fast=False)
+        fast = measure(input_dir, os.path.join(workdir, 'fast'), fast=True)
+        difference = compare(os.path.join(workdir, 'default'), os.path.join(workdir, 'fast'))
+
+    for name, result in (('default', default), ('fast', fast)):
+        print(f"{name:8} {result['seconds_per_thumbnail'] * 1000:8.1f} ms/thumbnail  "
+              f"peak RSS {result['peak_rss_mb']:7.1f} MB")
+    print(f"speedup: {default['seconds_per_thumbnail'] / fast['seconds_per_thumbnail']:.2f}x")
+    print(f"max mean pixel difference: {difference:.2f} (tolerance {args.tolerance})")
+    sys.exit(0 if difference <= args.tolerance else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark album uploads against the local fake GitHub server: the contents API
+one file at a time, the contents API with a pool of requests in flight, the
+Git Data API single-commit backend, and the local checkout + git push backend
+(pushing to a local bare repository)
+
+    python3 benchmarks/bench_upload.py --count 60 --size-kb 2048 --latency 0.1 --workers 8
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import git
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_watermark import make_automator
+from fake_github import FakeGitHub
+
+
+def make_bare_remote(workdir: str, repo_name: str) -> str:
+    """Create a bare repository with an initial commit on main, standing in for GitHub"""
+    remote = os.path.join(workdir, 'remotes', f'{repo_name}.git')
+    git.Repo.init(remote, bare=True, initial_branch='main')
+    seed = git.Repo.init(os.path.join(workdir, 'seed', repo_name), initial_branch='main')
+    seed.index.commit('Initial commit')
+    seed.create_remote('origin', remote).push('main')
+    return remote
+
+
+def run_git(workdir: str, files: list, repo_name: str) -> float:
+    """Write the files into a checkout and push them as one commit; returns seconds spent syncing"""
+    make_bare_remote(workdir, repo_name)
+    automator = make_automator(workdir, 1,
+                               photo_repo_url_template=os.path.join(workdir, 'remotes', '{repo}.git'),
+                               photo_repo_dir_template=os.path.join(workdir, 'checkouts', '{repo}'))
+    start = time.perf_counter()
+    repo = automator.open_photo_repo(repo_name)
+    clone_time = time.perf_counter() - start
+    
+    # In the real pipeline add_watermark writes here directly, so the copy is not timed
+    os.makedirs(os.path.join(repo.working_tree_dir, '01-01-25'))
+    for path, filename in files:
+        shutil.copy(path, os.path.join(repo.working_tree_dir, '01-01-25', filename))
+    start = time.perf_counter()
+    uploaded, _ = automator.commit_album_to_checkout(repo, [filename for _, filename in files], [], '01-01-25')
+    elapsed = clone_time + time.perf_counter() - start
+    if len(uploaded) != len(files):
+        raise SystemExit(f"push incomplete: {len(uploaded)}/{len(files)}")
+    return elapsed
+
+
+def run(server: FakeGitHub, workdir: str, files: list, workers: int, backend: str, repo_name: str) -> float:
+    """Upload every file once with the given backend and concurrency and return seconds"""
+    automator = make_automator(workdir, 1, github_api_url=server.url, github_token='fake',
+                               upload_workers=workers, retry_backoff=0.05)
+    start = time.perf_counter()
+    if backend == 'git-data':
+        uploaded, _ = automator.commit_album_to_github(files, [], repo_name, '01-01-25')
+    else:
+        uploaded = automator.batch_upload_to_github(files, repo_name, '01-01-25')
+    elapsed = time.perf_counter() - start
+    if len(uploaded) != len(files) or len(server.files(repo_name)) != len(files):
+        raise SystemExit(f"upload incomplete: {len(uploaded)}/{len(files)}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GitHub uploads against a local stub')
+    parser.add_argument('--count', type=int, default=60, help='Files to upload')
+    parser.add_argument('--size-kb', type=int, default=2048, help='Size of each file')
+    parser.add_argument('--latency', type=float, default=0.1, help='Simulated round-trip latency (s)')
+    parser.add_argument('--workers', type=int, default=8, help='Upload requests in flight')
+    parser.add_argument('--fail-every', type=int, default=10, help='Answer every Nth write with 502')
+    parser.add_argument('--rate-limit-every', type=int, default=15,
+                        help='Answer every Nth write with a secondary rate limit')
+    parser.add_argument('--commit-time', type=float, default=0.02,
+                        help='Seconds a contents API write takes to commit; overlapping ones conflict with 409')
+    args = parser.parse_args()
+
+    server = FakeGitHub(args.latency, args.fail_every, args.rate_limit_every, args.commit_time).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            files = []
+            for i in range(args.count):
+                path = os.path.join(workdir, f"IMG_{i:04d}.JPG")
+                with open(path, 'wb') as f:
+                    f.write(os.urandom(args.size_kb * 1024))
+                files.append((path, os.path.basename(path)))
+
+            total_mb = args.count * args.size_kb / 1024
+            runs = (('contents', 1, 'serial'), ('contents', args.workers, 'pooled'),
+                    ('git-data', args.workers, 'git-data'))
+            for backend, workers, repo_name in runs:
+                server.max_in_flight = server.conflicts = 0
+                with open(os.devnull, 'w') as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull
+                    try:
+                        elapsed = run(server, workdir, files, workers, backend, repo_name)
+                    finally:
+                        sys.stdout = stdout
+                commits = server.repo(repo_name).commit_count() - 1
+                print(f"{backend:9} {workers:3} in flight: {elapsed:7.2f}s  {args.count / elapsed:6.1f} files/s  "
+                      f"{total_mb / elapsed:6.1f} MB/s  {commits:4} commits  "
+                      f"(server saw max {server.max_in_flight} concurrent, {server.conflicts} conflicts)")
+
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    elapsed = run_git(workdir, files, 'git-push')
+                finally:
+                    sys.stdout = stdout
+            print(f"{'git':9}   - push:      {elapsed:7.2f}s  {args.count / elapsed:6.1f} files/s  "
+                  f"{total_mb / elapsed:6.1f} MB/s     1 commits  (local bare repository)")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
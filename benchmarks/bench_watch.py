@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Measure ingest latency of automate_gallery.py --watch against a temp directory
+and the local fake GitHub server
+
+Photos are copied into a watched inbox in bursts, each file written slowly in
+chunks like a card reader would, while PhotoGalleryAutomator.watch() runs in a
+thread. For every photo the script records how long after its last byte it was
+on the (fake) photo repo and listed in the album's gallery.json, then checks
+that no half-written photo was ever uploaded.
+
+    python3 benchmarks/bench_watch.py --bursts 3 --burst-size 6 --gap 4
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+import contextlib
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+from synthetic import generate_album
+from bench_watermark import make_automator
+from fake_github import FakeGitHub
+
+
+def copy_slowly(src: str, dst: str, seconds: float, chunks: int = 8):
+    """Write src to dst in chunks spread over `seconds`"""
+    with open(src, 'rb') as f:
+        data = f.read()
+    step = -(-len(data) // chunks)
+    with open(dst, 'wb') as out:
+        for i in range(0, len(data), step):
+            out.write(data[i:i + step])
+            out.flush()
+            time.sleep(seconds / chunks)
+
+
+def gallery_names(path: str) -> set:
+    try:
+        with open(path) as f:
+            return {image['name'] for image in json.load(f)['images']}
+    except (OSError, ValueError):
+        return set()
+
+
+def monitor(server: FakeGitHub, repo_name: str, gallery_json: str, seen: dict, stop: threading.Event):
+    """Record when each photo first shows up on the photo repo and in gallery.json"""
+    while not stop.is_set():
+        now = time.monotonic()
+        for filename in {path.rsplit('/', 1)[-1] for path in server.files(repo_name)} - set(seen['uploaded']):
+            seen['uploaded'][filename] = now
+        for filename in gallery_names(gallery_json) - set(seen['listed']):
+            seen['listed'][filename] = now
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark watch mode ingest latency')
+    parser.add_argument('--bursts', type=int, default=3, help='Bursts of photos copied into the inbox')
+    parser.add_argument('--burst-size', type=int, default=6, help='Photos per burst')
+    parser.add_argument('--gap', type=float, default=4.0, help='Seconds between bursts')
+    parser.add_argument('--write-seconds', type=float, default=0.4, help='Time to write one photo')
+    parser.add_argument('--megapixels', type=float, default=4.0, help='Photo resolution')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake GitHub latency per request (s)')
+    parser.add_argument('--backend', default='contents', choices=['contents', 'git-data'], help='Sync backend')
+    parser.add_argument('--settle', type=float, default=1.0, help='Seconds a photo must stay unchanged')
+    parser.add_argument('--max-wait', type=float, default=30.0,
+                        help='Seconds before ready photos go without waiting for the ones still being written')
+    parser.add_argument('--jobs', type=int, default=2, help='Watermarking processes')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    server = FakeGitHub(args.latency).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        source = os.path.join(workdir, 'source')
+        inbox = os.path.join(workdir, 'inbox')
+        os.makedirs(inbox)
+        filenames = generate_album(source, args.bursts * args.burst_size, args.megapixels)
+        automator = make_automator(workdir, args.jobs, github_api_url=server.url, github_token='fake',
+                                   sync_backend=args.backend, retry_backoff=0.05, watch_settle=args.settle,
+                                   watch_max_wait=args.max_wait, watch_poll_interval=0.25, watch_retry_delay=1.0,
+                                   gallery_script_path=os.path.join(REPO_ROOT, 'scripts', 'gallery.py'),
+                                   photos_html_path=os.path.join(workdir, 'photos.html'),
+                                   catalog_path=os.path.join(workdir, 'albums.json'))
+        date_str = '01-08-25'
+        repo_name = f"RocknBirra-Foto{automator.current_year}"
+        gallery_json = os.path.join(workdir, 'images', str(automator.current_year), date_str, 'gallery.json')
+
+        batches = []
+        run_automation = automator.run_automation
+        def counted(*a, **kw):
+            batches.append(len(kw.get('pending', ())))
+            return run_automation(*a, **kw)
+        automator.run_automation = counted
+
+        stop, stop_monitor = threading.Event(), threading.Event()
+        seen = {'uploaded': {}, 'listed': {}}
+        log = open(os.path.join(workdir, 'watch.log'), 'w')
+        with contextlib.redirect_stdout(log):
+            watcher = threading.Thread(target=automator.watch, args=(inbox, date_str, '#Watch', filenames[0]),
+                                       kwargs={'stop': stop})
+            watcher.start()
+            observer = threading.Thread(target=monitor, args=(server, repo_name, gallery_json, seen, stop_monitor))
+            observer.start()
+
+            written = {}
+            for burst in range(args.bursts):
+                for filename in filenames[burst * args.burst_size:(burst + 1) * args.burst_size]:
+                    copy_slowly(os.path.join(source, filename), os.path.join(inbox, filename), args.write_seconds)
+                    written[filename] = time.monotonic()
+                time.sleep(args.gap)
+
+            deadline = time.monotonic() + 120
+            while min(len(seen['uploaded']), len(seen['listed'])) < len(filenames) and time.monotonic() < deadline:
+                time.sleep(0.1)
+            stop_monitor.set()
+            observer.join()
+            stop.set()
+            watcher.join()
+        log.close()
+
+        # Every uploaded photo must be complete
+        broken = []
+        for path, data in server.files(repo_name).items():
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    image.load()
+            except OSError:
+                broken.append(path)
+    server.stop()
+
+    # Measured from the last byte of each photo
+    upload = [seen['uploaded'][f] - written[f] for f in filenames if f in seen['uploaded']]
+    listed = [seen['listed'][f] - written[f] for f in filenames if f in seen['listed']]
+    print(f"{len(filenames)} photos in {args.bursts} bursts, {len(batches)} batches "
+          f"({sum(1 for p in batches if p)} with photos still being written)")
+    for name, values in (('on photo repo', upload), ('in gallery.json', listed)):
+        if values:
+            print(f"{name:16} median {statistics.median(values):6.2f}s  max {max(values):6.2f}s  ({len(values)} photos)")
+    print(f"missing: {len(filenames) - min(len(upload), len(listed))}, broken uploads: {len(broken)}")
+    if broken or min(len(upload), len(listed)) != len(filenames):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
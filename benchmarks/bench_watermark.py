@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark watermarking on a synthetic album: serial vs parallel, and
+add_watermark throughput with and without the logo cache
+
+    python3 benchmarks/bench_watermark.py --count 24 --megapixels 12 --jobs 4
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from automate_gallery import PhotoGalleryAutomator
+from synthetic import generate_album
+
+
+def make_automator(workdir: str, jobs: int, **config) -> PhotoGalleryAutomator:
+    """Build an automator from a throwaway config file"""
+    config.setdefault('watermark_logo_path', os.path.join(REPO_ROOT, 'assets', 'logo.png'))
+    config_path = os.path.join(workdir, f'config-{jobs}.json')
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+    return PhotoGalleryAutomator(config_path, jobs=jobs)
+
+
+def digest(paths: list) -> str:
+    """Hash the outputs so serial and parallel runs can be compared"""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def run(automator: PhotoGalleryAutomator, input_dir: str, output_dir: str, filenames: list) -> tuple:
+    """Watermark the album once and return (seconds, output digest)"""
+    os.makedirs(output_dir, exist_ok=True)
+    files = [(os.path.join(input_dir, name), os.path.join(output_dir, name)) for name in filenames]
+    start = time.perf_counter()
+    done = automator.watermark_photos(files)
+    elapsed = time.perf_counter() - start
+    return elapsed, digest([dst for _, dst in done])
+
+
+def run_add_watermark(automator: PhotoGalleryAutomator, input_dir: str, output_dir: str, filenames: list) -> float:
+    """Call add_watermark in-process for every photo and return photos/s"""
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    for name in filenames:
+        automator.add_watermark(os.path.join(input_dir, name), os.path.join(output_dir, name))
+    return len(filenames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark watermarking')
+    parser.add_argument('--count', type=int, default=24, help='Photos in the synthetic album')
+    parser.add_argument('--megapixels', type=float, default=12.0, help='Photo resolution')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Parallel worker count')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_dir = os.path.join(workdir, 'album')
+        print(f"Generating {args.count} photos at {args.megapixels} MP...")
+        filenames = generate_album(input_dir, args.count, args.megapixels)
+
+        serial, serial_digest = run(make_automator(workdir, 1), input_dir,
+                                    os.path.join(workdir, 'serial'), filenames)
+        parallel, parallel_digest = run(make_automator(workdir, args.jobs), input_dir,
+                                        os.path.join(workdir, 'parallel'), filenames)
+
+        uncached = run_add_watermark(make_automator(workdir, 1, watermark_cache_size=0), input_dir,
+                                     os.path.join(workdir, 'uncached'), filenames)
+        cached = run_add_watermark(make_automator(workdir, 1), input_dir,
+                                   os.path.join(workdir, 'cached'), filenames)
+
+    print(f"serial   (1 job):  {serial:7.2f}s  {args.count / serial:6.2f} photos/s")
+    print(f"parallel ({args.jobs} jobs): {parallel:7.2f}s  {args.count / parallel:6.2f} photos/s")
+    print(f"speedup: {serial / parallel:.2f}x")
+    print(f"identical output: {serial_digest == parallel_digest}")
+    print(f"add_watermark without logo cache: {uncached:6.2f} photos/s")
+    print(f"add_watermark with logo cache:    {cached:6.2f} photos/s ({cached / uncached:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
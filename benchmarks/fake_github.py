@@ -0,0 +1,262 @@
+"""
+Local stand-in for the parts of the GitHub REST API used by automate_gallery.py
+(repository creation, the contents API and the blobs/trees/commits/refs Git Data API)
+
+Repositories are kept in memory as refs -> commits -> flat trees -> blobs, with
+SHAs computed the same way git does, so clients can be pointed at it with the
+'github_api_url' config key:
+
+    server = FakeGitHub(latency=0.05)
+    server.start()
+    ... config['github_api_url'] = server.url ...
+    server.stop()
+"""
+
+import re
+import json
+import time
+import base64
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA-1 of a blob exactly as git computes it"""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class FakeRepo:
+    def __init__(self):
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+        self.commit({}, 'Initial commit', [])
+
+    def _object_sha(self, kind: str, payload) -> str:
+        return hashlib.sha1(f'{kind} {json.dumps(payload, sort_keys=True)}'.encode()).hexdigest()
+
+    def add_tree(self, entries: dict) -> str:
+        sha = self._object_sha('tree', entries)
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def add_commit(self, tree_sha: str, message: str, parents: list) -> str:
+        sha = self._object_sha('commit', [tree_sha, message, parents, time.time()])
+        self.commits[sha] = {'tree': tree_sha, 'message': message, 'parents': parents}
+        return sha
+
+    def commit(self, entries: dict, message: str, parents: list) -> str:
+        """Create a tree and commit and move main to it"""
+        sha = self.add_commit(self.add_tree(entries), message, parents)
+        self.refs['heads/main'] = sha
+        return sha
+
+    def head_tree(self) -> dict:
+        return self.trees[self.commits[self.refs['heads/main']]['tree']]
+
+    def commit_count(self) -> int:
+        """Number of commits reachable from main"""
+        count, sha = 0, self.refs['heads/main']
+        while sha:
+            count += 1
+            parents = self.commits[sha]['parents']
+            sha = parents[0] if parents else None
+        return count
+
+
+class FakeGitHub:
+    def __init__(self, latency: float = 0.0, fail_every: int = 0, rate_limit_every: int = 0,
+                 commit_time: float = 0.02):
+        """latency: seconds added to every request; fail_every / rate_limit_every:
+        answer every Nth write with a 502 / a 403 secondary rate limit (0 disables); commit_time: seconds
+        a contents API write takes to commit, during which another write moving main makes it fail with 409"""
+        self.latency = latency
+        self.commit_time = commit_time
+        self.conflicts = 0
+        self.fail_every = fail_every
+        self.rate_limit_every = rate_limit_every
+        self.repos = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.writes = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def repo(self, name: str) -> FakeRepo:
+        return self.repos.setdefault(name, FakeRepo())
+
+    def files(self, repo_name: str) -> dict:
+        """Current content of main as {path: bytes}"""
+        repo = self.repo(repo_name)
+        return {path: repo.blobs[sha] for path, sha in repo.head_tree().items()}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload=None, headers: dict = None):
+                body = json.dumps(payload if payload is not None else {}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _handle(self):
+                body = self._body()
+                with fake.lock:
+                    fake.requests += 1
+                    fake._in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake._in_flight)
+                    writes = fake.writes = fake.writes + (self.command != 'GET')
+                try:
+                    time.sleep(fake.latency)
+                    if self.command != 'GET':
+                        if fake.fail_every and writes % fake.fail_every == 0:
+                            return self._reply(502, {'message': 'Bad Gateway'})
+                        if fake.rate_limit_every and writes % fake.rate_limit_every == 0:
+                            return self._reply(403, {'message': 'You have exceeded a secondary rate limit'},
+                                               {'Retry-After': '0'})
+                    status, payload = fake.route(self.command, self.path, body)
+                    self._reply(status, payload)
+                finally:
+                    with fake.lock:
+                        fake._in_flight -= 1
+
+            do_GET = do_PUT = do_POST = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+    def route(self, method: str, path: str, body: dict):
+        if method == 'POST' and path == '/user/repos':
+            created = body['name'] not in self.repos
+            self.repo(body['name'])
+            return (201, {'name': body['name']}) if created else (422, {'message': 'name already exists'})
+
+        match = re.match(r'^/repos/[^/]+/([^/]+)/contents/(.+)$', path)
+        if match:
+            with self.lock:
+                repo = self.repo(match.group(1))
+                base = repo.refs['heads/main']
+            if method != 'GET' and self.commit_time:
+                # Like GitHub, each contents write commits on the head it started from, so overlapping
+                # writes race for the branch and the losers get a 409
+                time.sleep(self.commit_time)
+            with self.lock:
+                if method != 'GET' and repo.refs['heads/main'] != base:
+                    self.conflicts += 1
+                    return 409, {'message': f"refs/heads/main is at {repo.refs['heads/main']} but expected {base}"}
+                return self.contents(method, repo, match.group(2).strip('/'), body)
+        match = re.match(r'^/repos/[^/]+/([^/]+)/git/(.+)$', path)
+        if match:
+            with self.lock:
+                return self.git_data(method, self.repo(match.group(1)), match.group(2), body)
+        return 404, {'message': 'Not Found'}
+
+    def git_data(self, method: str, repo: FakeRepo, path: str, body: dict):
+        if method == 'GET' and path.startswith('ref/'):
+            ref = path[len('ref/'):]
+            if ref not in repo.refs:
+                return 404, {'message': 'Not Found'}
+            return 200, {'ref': f'refs/{ref}', 'object': {'sha': repo.refs[ref], 'type': 'commit'}}
+
+        if method == 'GET' and path.startswith('commits/'):
+            commit = repo.commits.get(path[len('commits/'):])
+            if commit is None:
+                return 404, {'message': 'Not Found'}
+            return 200, {'sha': path[len('commits/'):], 'tree': {'sha': commit['tree']},
+                         'message': commit['message'], 'parents': [{'sha': p} for p in commit['parents']]}
+
+        if method == 'POST' and path == 'blobs':
+            data = base64.b64decode(body['content']) if body.get('encoding') == 'base64' else body['content'].encode()
+            sha = git_blob_sha(data)
+            repo.blobs[sha] = data
+            return 201, {'sha': sha}
+
+        if method == 'POST' and path == 'trees':
+            entries = dict(repo.trees.get(body.get('base_tree'), {}))
+            for entry in body['tree']:
+                if entry.get('sha') is None:
+                    entries.pop(entry['path'], None)
+                elif entry['sha'] not in repo.blobs:
+                    return 422, {'message': f"unknown blob {entry['sha']}"}
+                else:
+                    entries[entry['path']] = entry['sha']
+            return 201, {'sha': repo.add_tree(entries)}
+
+        if method == 'POST' and path == 'commits':
+            if body['tree'] not in repo.trees:
+                return 422, {'message': 'unknown tree'}
+            return 201, {'sha': repo.add_commit(body['tree'], body['message'], body.get('parents', []))}
+
+        if method == 'PATCH' and path.startswith('refs/'):
+            ref = path[len('refs/'):]
+            commit = repo.commits.get(body['sha'])
+            if commit is None:
+                return 422, {'message': 'unknown commit'}
+            if not body.get('force') and repo.refs.get(ref) not in commit['parents']:
+                return 422, {'message': 'Update is not a fast forward'}
+            repo.refs[ref] = body['sha']
+            return 200, {'ref': f'refs/{ref}', 'object': {'sha': body['sha'], 'type': 'commit'}}
+
+        return 404, {'message': 'Not Found'}
+
+    def contents(self, method: str, repo: FakeRepo, path: str, body: dict):
+        tree = dict(repo.head_tree())
+        if method == 'GET':
+            if path in tree:
+                return 200, {'name': path.rsplit('/', 1)[-1], 'path': path, 'sha': tree[path], 'type': 'file'}
+            prefix = path + '/'
+            listing = [{'name': p[len(prefix):], 'path': p, 'sha': sha, 'type': 'file'}
+                       for p, sha in sorted(tree.items()) if p.startswith(prefix) and '/' not in p[len(prefix):]]
+            return (200, listing) if listing else (404, {'message': 'Not Found'})
+
+        if method == 'PUT':
+            if path in tree and body.get('sha') != tree[path]:
+                if 'sha' not in body:
+                    return 422, {'message': 'Invalid request. "sha" wasn\'t supplied.'}
+                return 409, {'message': f"{path} does not match {body['sha']}"}
+            data = base64.b64decode(body['content'])
+            sha = git_blob_sha(data)
+            repo.blobs[sha] = data
+            created = path not in tree
+            tree[path] = sha
+            repo.commit(tree, body.get('message', ''), [repo.refs['heads/main']])
+            return (201 if created else 200), {'content': {'name': path.rsplit('/', 1)[-1], 'path': path, 'sha': sha}}
+
+        if method == 'DELETE':
+            if path not in tree:
+                return 404, {'message': 'Not Found'}
+            if body.get('sha') != tree[path]:
+                return 409, {'message': f"{path} does not match {body.get('sha')}"}
+            del tree[path]
+            repo.commit(tree, body.get('message', ''), [repo.refs['heads/main']])
+            return 200, {'content': None}
+
+        return 405, {'message': 'Method Not Allowed'}
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: time every pipeline stage in isolation on a deterministic
+synthetic album, write the results as JSON and compare them with a baseline
+
+Stages: add_watermark (including correct_orientation), create_thumbnail at each
+ladder height, the dHash of each photo and the near-duplicate matching over
+--html-photos hashes, generate_html from the index, update_photos_html through the
+album catalog, and uploads (contents API and Git Data API) against the local
+fake GitHub server. Each stage runs --repeat times and the median is kept.
+Every stage also reports the peak RSS it reached; watermark_parallel runs the
+process pool under the --max-memory budget and reports its workers' peak too.
+
+    python3 benchmarks/run_suite.py --save-baseline benchmarks/baseline.json
+    ... change something ...
+    python3 benchmarks/run_suite.py --baseline benchmarks/baseline.json --output results.json
+
+With --baseline the exit status is 1 when a stage is slower than the baseline by
+more than --threshold (default 10%).
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import resource
+import statistics
+import tempfile
+import PIL
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import random
+import gallery
+import catalog
+import dedupe
+from synthetic import generate_album
+from bench_watermark import make_automator
+from bench_upload import run as run_upload
+from bench_thumbnail import peak_rss_mb
+from fake_github import FakeGitHub
+
+
+def time_stage(repeat: int, func) -> list:
+    """Run func() `repeat` times and return the durations in seconds"""
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def reset_peak_rss():
+    """Restart VmHWM from the current RSS so each stage reports its own peak (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def children_peak_rss_mb() -> float:
+    """Largest peak RSS of any finished child process so far"""
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def bench_watermark(workdir: str, album: str, filenames: list, args) -> tuple:
+    automator = make_automator(workdir, 1)
+    output_dir = os.path.join(workdir, 'watermarked')
+    os.makedirs(output_dir, exist_ok=True)
+
+    def run(_):
+        for name in filenames:
+            automator.add_watermark(os.path.join(album, name), os.path.join(output_dir, name))
+    return time_stage(args.repeat, run), len(filenames)
+
+
+def bench_watermark_parallel(workdir: str, album: str, filenames: list, args) -> tuple:
+    automator = make_automator(workdir, args.jobs, max_memory_mb=args.max_memory)
+    output_dir = os.path.join(workdir, 'watermarked-parallel')
+    os.makedirs(output_dir, exist_ok=True)
+    files = [(os.path.join(album, name), os.path.join(output_dir, name)) for name in filenames]
+
+    def run(_):
+        if len(automator.watermark_photos(files)) != len(files):
+            raise SystemExit("watermarking failed")
+    return time_stage(args.repeat, run), len(filenames)
+
+
+def bench_thumbnail(height: int):
+    def bench(workdir: str, album: str, filenames: list, args) -> tuple:
+        thumbdir = os.path.join(workdir, 'thumbnails', f"{height}px")
+        os.makedirs(thumbdir, exist_ok=True)
+
+        def run(_):
+            for name in filenames:
+                gallery.create_thumbnail(os.path.join(album, name), thumbdir, height, force=True)
+        return time_stage(args.repeat, run), len(filenames)
+    return bench
+
+
+def bench_dedupe_hash(workdir: str, album: str, filenames: list, args) -> tuple:
+    def run(_):
+        for name in filenames:
+            dedupe.dhash(os.path.join(album, name))
+    return time_stage(args.repeat, run), len(filenames)
+
+
+def bench_dedupe_match(workdir: str, album: str, filenames: list, args) -> tuple:
+    # Random hashes with every tenth one a near copy of its predecessor, matched the way process_photos does
+    rng = random.Random(args.seed)
+    hashes = {}
+    for i in range(args.html_photos):
+        value = rng.getrandbits(64) if i % 10 != 1 else hashes[f"IMG_{i - 1:04d}.JPG"] ^ (1 << rng.randrange(64))
+        hashes[f"IMG_{i:04d}.JPG"] = value
+
+    def run(_):
+        dedupe.near_duplicates(hashes)
+    return time_stage(args.repeat, run), len(hashes)
+
+
+def synthetic_index(count: int) -> dict:
+    """Index entries for `count` photos without touching any image"""
+    return {f"IMG_{i:04d}.JPG": {'size': 0, 'mtime': 0, 'formats': list(gallery.THUMBNAIL_FORMATS),
+                                 'lqip': 'data:image/webp;base64,' + 'A' * 200,
+                                 **{str(h): [h * 4 // 3, h] for h in gallery.THUMBNAIL_HEIGHTS}}
+            for i in range(count)}
+
+
+def bench_generate_html(workdir: str, album: str, filenames: list, args) -> tuple:
+    outputdir = os.path.join(workdir, 'gallery')
+    os.makedirs(outputdir, exist_ok=True)
+    gallery.save_index(outputdir, synthetic_index(args.html_photos))
+
+    def run(_):
+        gallery.generate_html(album, outputdir, 'Benchmark', 'https://example.invalid/photos', from_index=True)
+    return time_stage(args.repeat, run), args.html_photos
+
+
+def bench_update_photos_html(workdir: str, album: str, filenames: list, args) -> tuple:
+    catalog_path = os.path.join(workdir, 'albums.json')
+    photos_html_path = os.path.join(workdir, 'photos.html')
+    seeded = {'built': None, 'albums': {}}
+    for i in range(args.albums):
+        catalog.set_album(seeded, 2000 + i // 10, f"{i % 10 + 10:02d}-07-{(2000 + i // 10) % 100:02d}", f"#Album {i}",
+                          'IMG_0000', 100)
+    catalog.save_catalog(seeded, catalog_path)
+    automator = make_automator(workdir, 1, catalog_path=catalog_path, photos_html_path=photos_html_path)
+    automator.current_year = 2099
+
+    def run(i):
+        # A new album every time, so the page is really rebuilt
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                automator.update_photos_html(f"{i % 28 + 1:02d}-08-99", f"#Run {i}", 'IMG_0000.JPG')
+            finally:
+                sys.stdout = stdout
+    return time_stage(args.repeat, run), 1
+
+
+def bench_upload(backend: str):
+    def bench(workdir: str, album: str, filenames: list, args) -> tuple:
+        files = [(os.path.join(album, name), name) for name in filenames]
+        server = FakeGitHub(args.latency).start()
+        try:
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    durations = [run_upload(server, workdir, files, args.workers, backend, f"{backend}-{i}")
+                                 for i in range(args.repeat)]
+                finally:
+                    sys.stdout = stdout
+        finally:
+            server.stop()
+        return durations, len(files)
+    return bench
+
+
+STAGES = {
+    'add_watermark': bench_watermark,
+    'watermark_parallel': bench_watermark_parallel,
+    **{f"create_thumbnail_{height}": bench_thumbnail(height) for height in gallery.THUMBNAIL_HEIGHTS},
+    'dedupe_hash': bench_dedupe_hash,
+    'dedupe_match': bench_dedupe_match,
+    'generate_html': bench_generate_html,
+    'update_photos_html': bench_update_photos_html,
+    'upload_contents': bench_upload('contents'),
+    'upload_git_data': bench_upload('git-data'),
+}
+
+
+def run_suite(args) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        album = os.path.join(workdir, 'album')
+        filenames = generate_album(album, args.count, args.megapixels, args.seed, tuple(args.orientations))
+        for name in args.stages or STAGES:
+            reset_peak_rss()
+            children_before = children_peak_rss_mb()
+            durations, items = STAGES[name](workdir, album, filenames, args)
+            seconds = statistics.median(durations)
+            results[name] = {'seconds': seconds, 'items': items, 'ms_per_item': seconds / items * 1000,
+                             'runs': durations, 'peak_rss_mb': peak_rss_mb()}
+            line = f"{name:24} {seconds:8.3f}s  {seconds / items * 1000:9.2f} ms/item  {peak_rss_mb():7.1f} MB peak"
+            if children_peak_rss_mb() > children_before:
+                results[name]['workers_peak_rss_mb'] = children_peak_rss_mb()
+                line += f"  ({children_peak_rss_mb():.1f} MB per worker)"
+            print(line, flush=True)
+    return {
+        'meta': {'python': platform.python_version(), 'pillow': PIL.__version__, 'machine': platform.machine(),
+                 'cpus': os.cpu_count(),
+                 'params': {key: getattr(args, key) for key in ('count', 'megapixels', 'seed', 'orientations',
+                                                               'repeat', 'latency', 'workers', 'html_photos',
+                                                               'albums', 'jobs', 'max_memory')}},
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Print current vs baseline per stage and return the stages that regressed"""
+    if current['meta']['params'] != baseline['meta']['params']:
+        print("warning: baseline was recorded with different parameters")
+    regressions = []
+    print(f"{'stage':24} {'baseline':>9} {'current':>9} {'change':>8} {'peak MB':>15}")
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            print(f"{name:24} {'-':>9} {result['seconds']:8.3f}s {'new':>8}")
+            continue
+        before = baseline['results'][name]['seconds']
+        change = result['seconds'] / before - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        rss = f"{baseline['results'][name].get('peak_rss_mb', 0):6.0f} -> {result['peak_rss_mb']:5.0f}"
+        print(f"{name:24} {before:8.3f}s {result['seconds']:8.3f}s {change:+7.1%} {rss}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--count', type=int, default=12, help='Photos in the synthetic album')
+    parser.add_argument('--megapixels', type=float, default=12.0, help='Photo resolution')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic album')
+    parser.add_argument('--orientations', type=int, nargs='+', default=[1, 6, 3, 8],
+                        help='EXIF orientation tags, assigned round-robin')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage (the median is reported)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake GitHub latency per request (s)')
+    parser.add_argument('--workers', type=int, default=4, help='Upload requests in flight')
+    parser.add_argument('--jobs', type=int, default=4, help='Processes for watermark_parallel')
+    parser.add_argument('--max-memory', type=int, metavar='MB', default=None,
+                        help='Memory budget for watermark_parallel (default: none)')
+    parser.add_argument('--html-photos', type=int, default=500, help='Photos in the generate_html album')
+    parser.add_argument('--albums', type=int, default=100, help='Albums in the update_photos_html catalog')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='Only run these stages')
+    parser.add_argument('--output', help='Write the results as JSON')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write the results as the new baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='Compare with this baseline')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown before failing')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    current = run_suite(args)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(current, f, indent=2)
+                f.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
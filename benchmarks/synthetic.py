@@ -0,0 +1,44 @@
+"""
+Deterministic synthetic albums for benchmarks
+"""
+
+import os
+import random
+from PIL import Image, ExifTags
+
+
+def generate_photo(path: str, width: int, height: int, seed: int, quality: int = 92, orientation: int = 1):
+    """Write a deterministic camera-like JPEG (smooth colour blobs plus fine texture),
+    tagged with the given EXIF orientation when it isn't the default 1"""
+    rng = random.Random(seed)
+    blobs = Image.frombytes('RGB', (16, 12), rng.randbytes(16 * 12 * 3))
+    texture = Image.frombytes('RGB', (width // 8, height // 8), rng.randbytes((width // 8) * (height // 8) * 3))
+    img = Image.blend(blobs.resize((width, height), Image.Resampling.BICUBIC),
+                      texture.resize((width, height), Image.Resampling.NEAREST), 0.15)
+    if orientation == 1:
+        img.save(path, 'JPEG', quality=quality)
+        return
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = orientation
+    img.save(path, 'JPEG', quality=quality, exif=exif.tobytes())
+
+
+def generate_album(directory: str, count: int = 20, megapixels: float = 12.0, seed: int = 0,
+                   orientations: tuple = (1,)) -> list:
+    """Create `count` photos in `directory` (every third one portrait) and return their filenames
+
+    orientations: EXIF orientation tags assigned round-robin; for 5-8 the pixels are stored
+    sideways the way a camera does, so the photo still displays with the intended shape"""
+    os.makedirs(directory, exist_ok=True)
+    long_side = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    short_side = long_side * 3 // 4
+    filenames = []
+    for i in range(count):
+        filename = f"IMG_{i:04d}.JPG"
+        size = (short_side, long_side) if i % 3 == 2 else (long_side, short_side)
+        orientation = orientations[i % len(orientations)]
+        if orientation in (5, 6, 7, 8):
+            size = size[::-1]
+        generate_photo(os.path.join(directory, filename), *size, seed=seed + i, orientation=orientation)
+        filenames.append(filename)
+    return filenames
@@ -7,6 +7,15 @@ document.addEventListener("DOMContentLoaded", function() {
     }
 
     let lightGalleryInitialized = false;
+    let lightGalleryInstance = null;
+
+    // gallery.html only carries the first page of tiles, the rest come from the album manifest
+    const manifestUrl = galleryElement.dataset.manifest;
+    const totalItems = parseInt(galleryElement.dataset.total || "0", 10);
+    const pageSize = parseInt(galleryElement.dataset.pageSize || "40", 10);
+    let renderedItems = galleryElement.querySelectorAll(".gallery-item").length;
+    let manifest = null;
+    let loadingPage = false;
 
     function calculateRowHeight() {
         var screenWidth = window.innerWidth;
@@ -24,6 +33,98 @@ document.addEventListener("DOMContentLoaded", function() {
         return rowHeight;
     }
 
+    function renditionUrl(image, height, format) {
+        return manifest.src.replace("{height}", height).replace("{base}", image.base).replace("{format}", format);
+    }
+
+    function renditionSrcset(image, heights, format) {
+        return heights.slice().reverse().map(function (height) {
+            return renditionUrl(image, height, format) + " " + image.renditions[height][0] + "w";
+        }).join(", ");
+    }
+
+    function tileSizes(aspectRatio) {
+        // Same breakpoints as calculateRowHeight (and ROW_HEIGHTS in scripts/gallery.py)
+        return "(max-width: 449px) " + Math.round(aspectRatio * 110) + "px, " +
+               "(max-width: 799px) " + Math.round(aspectRatio * 150) + "px, " +
+               Math.round(aspectRatio * 200) + "px";
+    }
+
+    // Build the same markup as gallery_item in scripts/gallery.py
+    function createGalleryItem(image) {
+        const heights = Object.keys(image.renditions).map(Number).sort(function (a, b) { return b - a; });
+        const largest = image.renditions[heights[0]];
+        const fallbackHeight = heights.length > 1 ? heights[1] : heights[0];
+        const fallbackFormat = image.formats[image.formats.length - 1];
+        const sizes = tileSizes(largest[0] / largest[1]);
+
+        const item = document.createElement("a");
+        item.className = "gallery-item";
+        item.dataset.lgSize = largest[0] + "-" + largest[1];
+        item.dataset.src = renditionUrl(image, heights[0], fallbackFormat);
+        item.dataset.srcset = renditionSrcset(image, heights, fallbackFormat);
+        item.dataset.downloadUrl = manifest.download_url + "/" + image.name;
+
+        const picture = document.createElement("picture");
+        image.formats.slice(0, -1).forEach(function (format) {
+            const source = document.createElement("source");
+            source.type = "image/" + format;
+            source.srcset = renditionSrcset(image, heights, format);
+            source.sizes = sizes;
+            picture.appendChild(source);
+        });
+
+        const img = document.createElement("img");
+        img.className = "img-responsive";
+        img.src = renditionUrl(image, fallbackHeight, fallbackFormat);
+        img.srcset = renditionSrcset(image, heights, fallbackFormat);
+        img.sizes = sizes;
+        img.width = image.renditions[fallbackHeight][0];
+        img.height = fallbackHeight;
+        if (image.lqip) {
+            img.style.background = "url(" + image.lqip + ") center / cover";
+        }
+        picture.appendChild(img);
+        item.appendChild(picture);
+        return item;
+    }
+
+    function loadManifest() {
+        if (manifest) {
+            return Promise.resolve(manifest);
+        }
+        return fetch(manifestUrl).then(function (response) {
+            return response.json();
+        }).then(function (data) {
+            manifest = data;
+            return manifest;
+        });
+    }
+
+    // Append the next page once the bottom of the gallery is within a screen of the viewport
+    function loadNextPage() {
+        if (loadingPage || !manifestUrl || renderedItems >= totalItems) {
+            return;
+        }
+        if (galleryElement.getBoundingClientRect().bottom > window.innerHeight * 2) {
+            return;
+        }
+        loadingPage = true;
+        loadManifest().then(function () {
+            const page = manifest.images.slice(renderedItems, renderedItems + pageSize);
+            page.forEach(function (image) {
+                galleryElement.appendChild(createGalleryItem(image));
+            });
+            renderedItems += page.length;
+            console.log("Loaded " + renderedItems + "/" + totalItems + " photos");
+            jQuery(galleryElement).justifiedGallery('norewind');
+        }).catch(function (error) {
+            console.error("Could not load the album manifest", error);
+        }).finally(function () {
+            loadingPage = false;
+        });
+    }
+
     console.log("Gallery element found");
 
     // Initialize justifiedGallery
@@ -32,7 +133,8 @@ document.addEventListener("DOMContentLoaded", function() {
         lastRow: "nojustify",
         margins: 5,
         border: 0,
-        waitThumbnailsLoad: true,
+        waitThumbnailsLoad: false, // gallery.html carries width/height and a placeholder, lay out right away
+        imgSelector: '> img, > a > img, > a > picture > img', // thumbnails are wrapped in <picture>
         rowHeight: calculateRowHeight()
     }).on("jg.resize", function () {
         var newRowHeight = calculateRowHeight();
@@ -43,8 +145,12 @@ document.addEventListener("DOMContentLoaded", function() {
         console.log("justifiedGallery initialization complete");
 
         if (!lightGalleryInitialized) {
+            // Time to first layout, from navigation start (also visible in the DevTools performance panel)
+            performance.mark("gallery-first-layout");
+            console.log("Time to first layout: " + Math.round(performance.now()) + " ms");
+
             // Initialize lightGallery after justifiedGallery is complete
-            lightGallery(galleryElement, {
+            lightGalleryInstance = lightGallery(galleryElement, {
                 plugins: [lgZoom, lgThumbnail, lgFullscreen],
                 speed: 500,
                 thumbnail: true,
@@ -62,6 +168,12 @@ document.addEventListener("DOMContentLoaded", function() {
             });
             console.log("lightGallery initialization complete");
             lightGalleryInitialized = true;
+        } else {
+            // Pick up the tiles appended by loadNextPage
+            lightGalleryInstance.refresh();
         }
+        loadNextPage();
     });
+
+    window.addEventListener("scroll", loadNextPage, { passive: true });
 });
\ No newline at end of file
@@ -0,0 +1,162 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+import gallery
+
+# albums.json: one record per album keyed "{year}/{date}", from which photos.html is generated
+#
+#   python3 scripts/catalog.py import   # build albums.json from the entries already in photos.html
+#   python3 scripts/catalog.py build    # regenerate photos.html if the catalog changed since the last build
+CATALOG = "albums.json"
+PHOTOS_HTML = "photos.html"
+
+PHOTOS_HEAD = """<!DOCTYPE html>
+<html lang="it">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta name="description" content="Scopri le foto delle serate memorabili al Rock n'Birra Pub di Fontignano. Guarda le immagini degli eventi e rivivi i momenti migliori con la nostra galleria fotografica.">
+    <title>Foto delle Serate - Rock n'Birra Pub - Fontignano a Tavola</title>
+    <link rel="stylesheet" href="style.css">
+    <link rel="icon" type="image/png" href="./assets/birra.png">
+</head>
+<style>
+    .menu-header {
+        max-height: 100px;
+        overflow: hidden;
+    }
+</style>
+<header class="menu-header">
+    <a href="index.html" class="back-link">
+        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" class="back-arrow" style="padding: 1vw;"> 
+            <path fill="#ffffff" d="M12 2 L2 12 L12 22 L12 16 L22 16 L22 8 L12 8 Z"/>
+        </svg>
+    </a>
+    <h1>
+    Foto
+    </h1>
+</header>
+<body>
+    <div class="container">
+"""
+
+PHOTOS_FOOT = """    </div>
+</body>
+</html>
+"""
+
+ALBUM_ENTRY = re.compile(
+    r'<a\s+class="albums"\s+href="images/(\d{4})/([\d-]+)/gallery\.html"\s+'
+    r'style="--background-image-url:\s*url\(images/\d{4}/[\d-]+/(\d+)px/([^)]*)\.webp\);?">\s*'
+    r'<h2 class="album-title">(.*?)</h2>', re.S)
+
+def album_key(year, date_str):
+    return f"{year}/{date_str}"
+
+def load_catalog(path=CATALOG):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'built': None, 'albums': {}}
+
+def save_catalog(catalog, path=CATALOG):
+    gallery.write_atomic(path, [json.dumps(catalog, indent=2, sort_keys=True, ensure_ascii=False), "\n"])
+
+def count_photos(year, date_str, images_root="images"):
+    html_file_path = os.path.join(images_root, str(year), date_str, 'gallery.html')
+    if not os.path.exists(html_file_path):
+        return 0
+    return len(gallery.parse_gallery_html(html_file_path)[2])
+
+def cover_height(album):
+    # Albums recorded before the cover height was kept used the default ladder
+    return album.get('cover_height', gallery.fallback_height(gallery.THUMBNAIL_HEIGHTS))
+
+def set_album(catalog, year, date_str, title, cover, photos, cover_height=None):
+    # Insert or update an album; returns True when the record changed. cover_height: the thumbnail height
+    # (of the album's ladder) whose WebP rendition is the cover, by default the gallery fallback height
+    record = {'year': int(year), 'date': date_str, 'title': title, 'cover': cover, 'photos': photos,
+              'cover_height': cover_height or gallery.fallback_height(gallery.THUMBNAIL_HEIGHTS)}
+    key = album_key(year, date_str)
+    if catalog['albums'].get(key) == record:
+        return False
+    catalog['albums'][key] = record
+    return True
+
+def sorted_albums(catalog):
+    # Newest first: by year, then by the DD-MM-YY date within it
+    return sorted(catalog['albums'].values(), reverse=True,
+                  key=lambda album: (album['year'], datetime.strptime(album['date'], '%d-%m-%y')))
+
+def catalog_hash(catalog):
+    return hashlib.sha256(json.dumps(catalog['albums'], sort_keys=True).encode()).hexdigest()
+
+def photos_html_chunks(catalog):
+    yield PHOTOS_HEAD
+    year = None
+    for album in sorted_albums(catalog):
+        if album['year'] != year:
+            year = album['year']
+            yield f"        <!-- {year} -->\n"
+        label = album['date'].replace('-', '/')
+        if album['title']:
+            label = f"{label} <Br> {album['title']} "
+        prefix = f"images/{album['year']}/{album['date']}"
+        yield f"""        <div class="home-buttons">
+            <div class="card">
+                <a class="albums" href="{prefix}/gallery.html" style="--background-image-url: url({prefix}/{cover_height(album)}px/{album['cover']}.webp);">
+                    <h2 class="album-title">{label}</h2>
+                </a>
+            </div>
+        </div>
+"""
+    yield PHOTOS_FOOT
+
+def build_photos_html(catalog, photos_html_path=PHOTOS_HTML, catalog_path=CATALOG):
+    # Rewrite photos.html in one atomic write, only when the albums differ from the last build
+    digest = catalog_hash(catalog)
+    if catalog.get('built') == digest and os.path.exists(photos_html_path):
+        logging.info(f"{photos_html_path} is up to date")
+        return False
+    gallery.write_atomic(photos_html_path, photos_html_chunks(catalog))
+    catalog['built'] = digest
+    save_catalog(catalog, catalog_path)
+    logging.info(f"Wrote {len(catalog['albums'])} albums to {photos_html_path}")
+    return True
+
+def import_photos_html(photos_html_path=PHOTOS_HTML, images_root="images"):
+    # Build a catalog from the album entries of a hand-maintained photos.html
+    with open(photos_html_path, encoding='utf-8') as f:
+        content = f.read()
+    catalog = {'built': None, 'albums': {}}
+    for year, date_str, height, cover, label in ALBUM_ENTRY.findall(content):
+        parts = re.split(r'<br>', label, maxsplit=1, flags=re.I)
+        title = parts[1].strip() if len(parts) > 1 else ''
+        set_album(catalog, year, date_str, title, cover, count_photos(year, date_str, images_root), int(height))
+    return catalog
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Manage the album catalog behind photos.html")
+    parser.add_argument("command", choices=["import", "build"],
+                        help="import: create the catalog from photos.html; build: regenerate photos.html")
+    parser.add_argument("--catalog", default=CATALOG, help="Catalog file")
+    parser.add_argument("--photos-html", default=PHOTOS_HTML, help="Album list page")
+    parser.add_argument("--images", default="images", help="Root of the site albums, for photo counts")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        catalog = import_photos_html(args.photos_html, args.images)
+        # photos.html is where this came from, so it counts as built from it
+        catalog['built'] = catalog_hash(catalog)
+        save_catalog(catalog, args.catalog)
+        logging.info(f"Imported {len(catalog['albums'])} albums into {args.catalog}")
+    else:
+        build_photos_html(load_catalog(args.catalog), args.photos_html, args.catalog)
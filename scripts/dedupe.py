@@ -0,0 +1,123 @@
+from PIL import Image, ImageOps
+
+# Optional: vectorized Hamming distances; without NumPy (or for very large albums) a BK-tree is used instead
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# dHash: the photo shrunk to (HASH_SIZE + 1) x HASH_SIZE grey pixels, one bit per horizontal neighbour pair
+HASH_SIZE = 8
+
+# Near-duplicate when at most this many of the 64 bits differ (burst frames typically land within 0-6)
+DEFAULT_THRESHOLD = 6
+
+# All-pairs distances are computed with NumPy in blocks of rows up to this many photos; above it, the BK-tree
+NUMPY_MAX_PHOTOS = 20000
+NUMPY_BLOCK_ROWS = 512
+
+def dhash(path):
+    # Only needs a tiny image: JPEGs are decoded at the smallest DCT scale (1/8) above the hash grid
+    with Image.open(path) as image:
+        image.draft('L', (HASH_SIZE + 1, HASH_SIZE))
+        image = ImageOps.exif_transpose(image.convert('L'))
+        pixels = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX).tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = bits << 1 | (pixels[offset + col] < pixels[offset + col + 1])
+    return bits
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    # Metric tree over Hamming distance: a search only descends into children whose edge distance is
+    # within the threshold of the query's distance to the node
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, key):
+        if self.root is None:
+            self.root = (value, key, {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, key, {})
+                return
+            node = child
+
+    def search(self, value, threshold):
+        # [(key, distance)] of every value within threshold
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_value, key, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= threshold:
+                found.append((key, distance))
+            stack.extend(child for edge, child in children.items() if distance - threshold <= edge <= distance + threshold)
+        return found
+
+def _pairs_numpy(hashes, threshold):
+    values = np.array(hashes, dtype=np.uint64)
+    columns = np.arange(len(values))
+    for start in range(0, len(values), NUMPY_BLOCK_ROWS):
+        block = values[start:start + NUMPY_BLOCK_ROWS, None] ^ values[None, :]
+        if hasattr(np, 'bitwise_count'):
+            distances = np.bitwise_count(block)
+        else:
+            distances = np.unpackbits(block.view(np.uint8), axis=1).reshape(block.shape + (64,)).sum(axis=2)
+        # Upper triangle only: each pair once, never a photo with itself
+        rows = np.arange(start, start + len(block))[:, None]
+        for row, col in zip(*np.nonzero((distances <= threshold) & (columns[None, :] > rows))):
+            yield start + int(row), int(col), int(distances[row, col])
+
+def _pairs_bktree(hashes, threshold):
+    tree = BKTree()
+    for index, value in enumerate(hashes):
+        for other, distance in tree.search(value, threshold):
+            yield other, index, distance
+        tree.add(value, index)
+
+def near_duplicates(hashes, threshold=DEFAULT_THRESHOLD, preferred=()):
+    # {duplicate: (kept, distance)} for hashes {filename: dhash}. Photos linked by pairs within threshold, directly
+    # or through a chain of frames, are candidates of one group; within it, photos are taken in order (those of
+    # `preferred` first, then by filename: the earliest frame of a burst) and each one is either within threshold
+    # of a photo already kept, so a duplicate of the nearest of them, or kept itself. A chain drifting frame by
+    # frame therefore never makes two distinct photos duplicates of each other.
+    names = sorted(hashes)
+    values = [hashes[name] for name in names]
+    use_numpy = np is not None and len(names) <= NUMPY_MAX_PHOTOS
+    parent = list(range(len(names)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b, _ in (_pairs_numpy if use_numpy else _pairs_bktree)(values, threshold):
+        parent[root(a)] = root(b)
+
+    groups = {}
+    for index in range(len(names)):
+        groups.setdefault(root(index), []).append(names[index])
+    rank = {name: position for position, name in enumerate(preferred)}
+    duplicates = {}
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        kept = []
+        for name in sorted(members, key=lambda name: (rank.get(name, len(rank)), name)):
+            distance, nearest = min(((hamming(hashes[name], hashes[other]), other) for other in kept),
+                                    default=(threshold + 1, None))
+            if distance <= threshold:
+                duplicates[name] = (nearest, distance)
+            else:
+                kept.append(name)
+    return duplicates
@@ -1,42 +1,49 @@
 import argparse
+import base64
+import hashlib
+import io
+import json
 import logging
 import os
-from PIL import Image
+import re
+from PIL import Image, ImageOps, ExifTags, features
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import tracing
 
-def create_thumbnail(image_path, thumbdir, height, quality=85):
-    try:
-        base_name = os.path.splitext(os.path.basename(image_path))[0]
-        thumbnail_path = os.path.join(thumbdir, f"{base_name}.webp")
-        image = Image.open(image_path)
-        aspect_ratio = image.width / image.height
-        new_width = int(aspect_ratio * height)
-        
-        # Check if the thumbnail already exists
-        if os.path.exists(thumbnail_path):
-            logging.info(f"Thumbnail already exists: {thumbnail_path}")
-            return thumbnail_path, new_width, height
-        
-        image.thumbnail((new_width, height), Image.LANCZOS)
-        image.save(thumbnail_path, 'WEBP', quality=quality)
-        logging.info(f"Saved thumbnail as {thumbnail_path}")
-        return thumbnail_path, new_width, height
-    
-    except Exception as e:
-        logging.error(f"Error creating thumbnail for {image_path}: {e}")
-        raise
+# Rendition ladder: thumbnail heights, largest first so each one can be downscaled from the previous.
+# The largest is shown in the lightbox, the second one is the <img src> fallback (and the photos.html cover).
+THUMBNAIL_HEIGHTS = (768, 406, 240)
 
-def generate_html(imagedir, outputdir, title, repo_url):
-    # Create the output directory structure
-    os.makedirs(outputdir, exist_ok=True)
-    thumbdir_406 = os.path.join(outputdir, "406px")
-    thumbdir_768 = os.path.join(outputdir, "768px")
-    os.makedirs(thumbdir_406, exist_ok=True)
-    os.makedirs(thumbdir_768, exist_ok=True)
+# Encoders and their quality, most efficient first: each one becomes a <source>, the last one is the <img>
+THUMBNAIL_FORMATS = {'avif': 60, 'webp': 85}
+PIL_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP'}
+
+# libavif's default speed (6) makes AVIF about 3x slower than WebP per rendition; 8 costs about as much as
+# WebP for files within a few percent of the default's size, and still ~20% smaller than WebP
+ENCODER_OPTIONS = {'avif': {'speed': 8}}
+
+# Row heights picked by calculateRowHeight in gallery.js, as (max viewport width, row height), for `sizes`
+ROW_HEIGHTS = ((449, 110), (799, 150), (None, 200))
+
+# Inline placeholder: the photo shrunk to fit this box, stored in the index and written into gallery.html
+# as a base64 WebP data URI, shown as the tile background until the thumbnail itself has loaded
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
 
-    html_content = f"""<!DOCTYPE html>
+# Draft/reduce headroom used by Image.thumbnail: the JPEG decoder scales by 1/2, 1/4 or 1/8
+# while keeping at least this multiple of the target size. 2.0 is Pillow's default; fast mode
+# decodes at the nearest DCT scale above the target and lets LANCZOS finish from there.
+REDUCING_GAP = 2.0
+FAST_REDUCING_GAP = 1.0
+
+# Per-album record of the source stat and thumbnail sizes, kept next to gallery.html
+THUMBNAIL_INDEX = "thumbnails.json"
+
+# Album manifest read by gallery.js, and how many tiles the HTML shell carries before it takes over
+GALLERY_MANIFEST = "gallery.json"
+PAGE_SIZE = 40
+
+HTML_HEAD = """<!DOCTYPE html>
 <html lang="it">
 <head>
     <meta charset="UTF-8">
@@ -61,33 +68,10 @@ def generate_html(imagedir, outputdir, title, repo_url):
 <body>
 <div class="container-sm">
     <div class="row justify-content-center">
-        <div class="gallery-container" id="animated-thumbnails-gallery">
+        <div class="gallery-container" id="animated-thumbnails-gallery" data-manifest="{manifest}" data-total="{total}" data-page-size="{page_size}">
 """
 
-    for filename in os.listdir(imagedir):
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            image_path = os.path.join(imagedir, filename)
-            logging.info(f"Processing image: {image_path}")
-            try:
-                # Create thumbnails
-                thumb_406_path, width_406, height_406 = create_thumbnail(image_path, thumbdir_406, 406)
-                thumb_768_path, width_768, height_768 = create_thumbnail(image_path, thumbdir_768, 768)
-    
-                # Adjust paths to be relative to the HTML file's location
-                thumb_406_rel_path = os.path.relpath(thumb_406_path, outputdir)
-                thumb_768_rel_path = os.path.relpath(thumb_768_path, outputdir)
-    
-                # Add image details to HTML content
-                html_content += f"""
-              <a data-lg-size="{width_768}-{height_768}" class="gallery-item" data-src="./{thumb_768_rel_path}" data-download-url="{repo_url}/{filename}">
-                <img class="img-responsive" src="./{thumb_406_rel_path}" />
-              </a>
-    """
-    
-            except Exception as e:
-                logging.error(f"Error processing image {image_path}: {e}")
-
-    html_content += """
+HTML_FOOT = """
             </div>
         </div>
     </div>
@@ -104,18 +88,368 @@ def generate_html(imagedir, outputdir, title, repo_url):
 </html>
 """
 
-    # Save the HTML content to a file in the title directory
+def available_formats(formats):
+    # Drop encoders this Pillow build lacks (AVIF needs Pillow 11.2+), always keeping a WebP fallback
+    usable = {}
+    for ext, quality in formats.items():
+        if features.check(ext):
+            usable[ext] = quality
+        else:
+            logging.warning(f"Pillow has no {ext} encoder, skipping {ext} thumbnails")
+    if 'webp' not in usable:
+        usable['webp'] = THUMBNAIL_FORMATS['webp']
+    return usable
+
+def parse_formats(values):
+    # "avif:60 webp" -> {'avif': 60, 'webp': 85}
+    formats = {}
+    for value in values:
+        ext, _, quality = value.lower().partition(':')
+        formats[ext] = int(quality) if quality else THUMBNAIL_FORMATS.get(ext, 85)
+    return formats
+
+def fallback_height(heights):
+    return heights[1] if len(heights) > 1 else heights[0]
+
+def rendition_paths(outputdir, base_name, heights=THUMBNAIL_HEIGHTS, formats=THUMBNAIL_FORMATS):
+    return [os.path.join(outputdir, f"{height}px", f"{base_name}.{ext}") for height in heights for ext in formats]
+
+def placeholder(thumbnail_path):
+    # Decoding the smallest rendition costs a few milliseconds, far less than going back to the source
+    with Image.open(thumbnail_path) as image:
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def save_atomic(image, path, quality=85):
+    # Write to a temporary file first so an interrupted run never leaves a truncated thumbnail
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    ext = os.path.splitext(path)[1][1:].lower()
+    image_format = PIL_FORMATS[ext]
+    try:
+        with tracing.span('thumbnail.encode', format=image_format, height=image.height) as span:
+            image.save(tmp_path, image_format, quality=quality, **ENCODER_OPTIONS.get(ext, {}))
+            span.set(bytes=os.path.getsize(tmp_path))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def is_fresh(thumbnail_path, source_stat):
+    # A usable thumbnail is non-empty and not older than its source
+    try:
+        thumbnail_stat = os.stat(thumbnail_path)
+    except FileNotFoundError:
+        return False
+    return thumbnail_stat.st_size > 0 and thumbnail_stat.st_mtime_ns >= source_stat.st_mtime_ns
+
+def load_index(outputdir):
+    try:
+        with open(os.path.join(outputdir, THUMBNAIL_INDEX)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_index(outputdir, index):
+    path = os.path.join(outputdir, THUMBNAIL_INDEX)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def create_thumbnail(image_path, thumbdir, height, formats=THUMBNAIL_FORMATS, fast=False, force=False):
+    try:
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        thumbnail_paths = {ext: os.path.join(thumbdir, f"{base_name}.{ext}") for ext in formats}
+        fallback_path = thumbnail_paths[list(formats)[-1]]
+        
+        # Check if up-to-date thumbnails already exist (their header holds the final size)
+        source_stat = os.stat(image_path)
+        stale = [ext for ext, path in thumbnail_paths.items() if force or not is_fresh(path, source_stat)]
+        if not stale:
+            logging.info(f"Thumbnail already exists: {fallback_path}")
+            with Image.open(fallback_path) as thumbnail:
+                aspect_ratio = thumbnail.width / thumbnail.height
+            return fallback_path, int(aspect_ratio * height), height
+        
+        image = Image.open(image_path)
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+        rotated = orientation in (5, 6, 7, 8)
+        width, source_height = (image.height, image.width) if rotated else image.size
+        aspect_ratio = width / source_height
+        new_width = int(aspect_ratio * height)
+        
+        # Shrink before transposing so the decoder can still skip full-resolution work
+        box = (height, new_width) if rotated else (new_width, height)
+        # Decoding is lazy, so this span covers the (draft) decode as well as the resize
+        with tracing.span('thumbnail.decode_resize', height=height):
+            image.thumbnail(box, Image.LANCZOS, reducing_gap=FAST_REDUCING_GAP if fast else REDUCING_GAP)
+            image = ImageOps.exif_transpose(image)
+        for ext in stale:
+            save_atomic(image, thumbnail_paths[ext], formats[ext])
+            logging.info(f"Saved thumbnail as {thumbnail_paths[ext]}")
+        return fallback_path, new_width, height
+    
+    except Exception as e:
+        logging.error(f"Error creating thumbnail for {image_path}: {e}")
+        raise
+
+def create_thumbnails_from_image(image, base_name, outputdir, heights=THUMBNAIL_HEIGHTS, formats=THUMBNAIL_FORMATS):
+    """Write every rendition for an already decoded image, chaining the downscales"""
+    thumbnails = {}
+    for height in heights:
+        thumbdir = os.path.join(outputdir, f"{height}px")
+        os.makedirs(thumbdir, exist_ok=True)
+        
+        if image.height > height:
+            new_width = int(image.width / image.height * height)
+            with tracing.span('thumbnail.resize', height=height):
+                image = image.resize((new_width, height), Image.LANCZOS)
+        for ext, quality in formats.items():
+            thumbnail_path = os.path.join(thumbdir, f"{base_name}.{ext}")
+            save_atomic(image, thumbnail_path, quality)
+            logging.info(f"Saved thumbnail as {thumbnail_path}")
+        thumbnails[height] = (thumbnail_path, image.width, image.height)
+    return thumbnails
+
+@tracing.traced
+def thumbnail_entry(image_path, outputdir, entry, fast=False, force=False, heights=THUMBNAIL_HEIGHTS,
+                    formats=THUMBNAIL_FORMATS):
+    # Return the index entry for a source image, regenerating its thumbnails only when needed
+    source_stat = os.stat(image_path)
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    
+    unchanged = False
+    if not force and entry and entry['size'] == source_stat.st_size:
+        if entry['mtime'] == source_stat.st_mtime_ns:
+            unchanged = True
+        # Same bytes with a new mtime (e.g. a fresh clone): keep the thumbnails, refresh the stat
+        elif entry.get('sha256') == file_sha256(image_path):
+            entry = {**entry, 'mtime': source_stat.st_mtime_ns}
+            unchanged = True
+    
+    # A quality change makes the renditions stale just like a new source
+    requality = entry is not None and entry_quality(entry) != dict(formats)
+    if (unchanged and not requality and entry_formats(entry) == list(formats)
+            and entry_heights(entry) == sorted(heights, reverse=True) and all(os.path.exists(path) for path in rendition_paths(outputdir, base_name, heights, formats))):
+        if 'lqip' not in entry:
+            smallest = os.path.join(outputdir, f"{min(heights)}px", f"{base_name}.{list(formats)[-1]}")
+            entry = {**entry, 'lqip': placeholder(smallest)}
+        return entry
+    
+    # Always regenerate when the source or the quality no longer matches its index entry; otherwise only fill in
+    # missing renditions. Entries describe the published (watermarked) copy, so imagedir must hold those copies and
+    # never the originals
+    force = force or (entry is not None and (not unchanged or requality))
+    new_entry = {'size': source_stat.st_size, 'mtime': source_stat.st_mtime_ns,
+                 'sha256': entry['sha256'] if unchanged and 'sha256' in entry else file_sha256(image_path),
+                 'formats': list(formats), 'quality': dict(formats)}
+    with tracing.profiled():
+        for height in heights:
+            thumbdir = os.path.join(outputdir, f"{height}px")
+            os.makedirs(thumbdir, exist_ok=True)
+            thumbnail_path, thumb_width, thumb_height = create_thumbnail(image_path, thumbdir, height, formats,
+                                                                         fast=fast, force=force)
+            new_entry[str(height)] = [thumb_width, thumb_height]
+    # Heights go largest first, so the last thumbnail is the smallest one
+    new_entry['lqip'] = placeholder(thumbnail_path)
+    return new_entry
+
+def published_entry(image_path, outputdir, heights=THUMBNAIL_HEIGHTS, formats=THUMBNAIL_FORMATS):
+    # Index entry for renditions already written from the published copy at image_path (e.g. while watermarking),
+    # so a later run over that copy finds them current; the sizes come from the rendition headers
+    source_stat = os.stat(image_path)
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    entry = {'size': source_stat.st_size, 'mtime': source_stat.st_mtime_ns, 'sha256': file_sha256(image_path),
+             'formats': list(formats), 'quality': dict(formats)}
+    for height in heights:
+        thumbnail_path = os.path.join(outputdir, f"{height}px", f"{base_name}.{list(formats)[-1]}")
+        with Image.open(thumbnail_path) as thumbnail:
+            entry[str(height)] = [thumbnail.width, thumbnail.height]
+    entry['lqip'] = placeholder(os.path.join(outputdir, f"{min(heights)}px", f"{base_name}.{list(formats)[-1]}"))
+    return entry
+
+def entry_formats(entry):
+    # Entries written before the rendition ladder only had WebP thumbnails
+    return entry.get('formats', ['webp'])
+
+def entry_quality(entry):
+    # {ext: quality} the renditions were encoded with; entries written before it was kept used the defaults
+    return entry.get('quality', {ext: THUMBNAIL_FORMATS.get(ext, 85) for ext in entry_formats(entry)})
+
+def entry_heights(entry):
+    return sorted((int(key) for key in entry if key.isdigit()), reverse=True)
+
+def gallery_item(filename, entry, repo_url):
+    # <a> for justifiedGallery/lightGallery holding a <picture> with one <source> per format
+    base_name = os.path.splitext(filename)[0]
+    heights = entry_heights(entry)
+    formats = entry_formats(entry)
+    largest = entry[str(heights[0])]
+    fallback = fallback_height(heights)
+    fallback_width, _ = entry[str(fallback)]
+    aspect_ratio = largest[0] / largest[1]
+    
+    def srcset(ext):
+        return ", ".join(f"./{height}px/{base_name}.{ext} {entry[str(height)][0]}w" for height in reversed(heights))
+    
+    sizes = ", ".join(f"(max-width: {max_width}px) {round(aspect_ratio * row_height)}px" if max_width
+                      else f"{round(aspect_ratio * row_height)}px" for max_width, row_height in ROW_HEIGHTS)
+    # The placeholder fills the box sized by width/height until the browser has the real tile
+    style = f' style="background: url({entry.get("lqip")}) center / cover"' if 'lqip' in entry else ''
+    sources = "".join(f"""
+                  <source type="image/{ext}" srcset="{srcset(ext)}" sizes="{sizes}">""" for ext in formats[:-1])
+    return f"""
+              <a data-lg-size="{largest[0]}-{largest[1]}" class="gallery-item" data-src="./{heights[0]}px/{base_name}.{formats[-1]}" data-srcset="{srcset(formats[-1])}" data-download-url="{repo_url}/{filename}">
+                <picture>{sources}
+                  <img class="img-responsive" src="./{fallback}px/{base_name}.{formats[-1]}" srcset="{srcset(formats[-1])}" sizes="{sizes}" width="{fallback_width}" height="{fallback}"{style} />
+                </picture>
+              </a>
+    """
+
+def rendition_bytes(outputdir):
+    # Total bytes per (height, format) in an album, from the files actually on disk
+    totals = {}
+    for dirname in os.listdir(outputdir):
+        if not re.fullmatch(r'\d+px', dirname):
+            continue
+        for filename in os.listdir(os.path.join(outputdir, dirname)):
+            ext = os.path.splitext(filename)[1][1:].lower()
+            if ext in PIL_FORMATS:
+                count, size = totals.get((int(dirname[:-2]), ext), (0, 0))
+                totals[(int(dirname[:-2]), ext)] = (count + 1, size + os.path.getsize(os.path.join(outputdir, dirname, filename)))
+    return totals
+
+def print_report(name, totals):
+    print(f"{name}")
+    print(f"  {'height':>6} {'format':6} {'files':>5} {'bytes':>12} {'avg KiB':>8}")
+    for (height, ext), (count, size) in sorted(totals.items(), key=lambda item: (-item[0][0], item[0][1])):
+        print(f"  {height:6} {ext:6} {count:5} {size:12} {size / count / 1024:8.1f}")
+    for ext in sorted({ext for _, ext in totals}):
+        print(f"  {'total':>6} {ext:6} {sum(size for (_, e), (_, size) in totals.items() if e == ext):18}")
+
+def parse_gallery_html(html_file_path):
+    # Recover (title, repo_url, filenames) from a gallery.html written by generate_html
+    with open(html_file_path) as f:
+        content = f.read()
+    title = re.search(r'<h1>(.*?)</h1>', content, re.S).group(1).strip()
+    # The shell only holds the first page, the full list is in the album manifest
+    manifest_path = os.path.join(os.path.dirname(html_file_path), GALLERY_MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        return title, manifest['download_url'], [image['name'] for image in manifest['images']]
+    downloads = re.findall(r'data-download-url="([^"]*)/([^/"]+)"', content)
+    repo_url = downloads[0][0] if downloads else ''
+    return title, repo_url, [filename for _, filename in downloads]
+
+def manifest_image(filename, entry):
+    image = {'name': filename, 'base': os.path.splitext(filename)[0], 'formats': entry_formats(entry),
+             'renditions': {str(height): entry[str(height)] for height in entry_heights(entry)}}
+    if 'lqip' in entry:
+        image['lqip'] = entry['lqip']
+    return image
+
+def write_atomic(path, chunks):
+    # Stream chunks to a temporary file and move it into place, so readers never see half a file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def manifest_chunks(title, repo_url, items):
+    yield (f'{{"title":{json.dumps(title)},"download_url":{json.dumps(repo_url)},'
+           f'"src":"./{{height}}px/{{base}}.{{format}}","images":[')
+    for i, (filename, entry) in enumerate(items):
+        yield ("," if i else "") + "\n" + json.dumps(manifest_image(filename, entry), separators=(',', ':'))
+    yield "\n]}\n"
+
+def html_chunks(title, repo_url, items):
+    yield HTML_HEAD.format(title=title, manifest=GALLERY_MANIFEST, total=len(items), page_size=PAGE_SIZE)
+    for filename, entry in items[:PAGE_SIZE]:
+        yield gallery_item(filename, entry, repo_url)
+    yield HTML_FOOT
+
+@tracing.traced
+def generate_html(imagedir, outputdir, title, repo_url, fast=False, from_index=False, heights=THUMBNAIL_HEIGHTS,
+                  formats=THUMBNAIL_FORMATS, filenames=None):
+    # Create the output directory structure
+    os.makedirs(outputdir, exist_ok=True)
+    for height in heights:
+        os.makedirs(os.path.join(outputdir, f"{height}px"), exist_ok=True)
+    index = load_index(outputdir)
+    new_index = {}
+
+    # From the index alone no image (or even the source directory) is touched
+    requested = filenames is not None
+    if from_index:
+        filenames = sorted(index) if filenames is None else sorted(filenames)
+    elif filenames is None:
+        filenames = [f for f in os.listdir(imagedir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+
+    items = []
+    failed = []
+    for filename in filenames:
+        image_path = os.path.join(imagedir, filename)
+        logging.info(f"Processing image: {image_path}")
+        try:
+            entry = index[filename] if from_index else thumbnail_entry(image_path, outputdir, index.get(filename), fast,
+                                                                       heights=heights, formats=formats)
+            new_index[filename] = entry
+            items.append((filename, entry))
+    
+        except Exception as e:
+            logging.error(f"Error processing image {image_path}: {e}")
+            failed.append(filename)
+
+    # Every image of an explicit list must make it: pages without some would unpublish them
+    if requested and failed:
+        raise RuntimeError(f"{len(failed)} of {len(filenames)} images failed, {THUMBNAIL_INDEX} and the pages were "
+                           f"left unchanged")
+    save_index(outputdir, new_index)
+    write_atomic(os.path.join(outputdir, GALLERY_MANIFEST), manifest_chunks(title, repo_url, items))
+
+    # Save the HTML shell to a file in the title directory
     html_file_path = os.path.join(outputdir, 'gallery.html')
-    with open(html_file_path, 'w') as file:
-        file.write(html_content)
+    write_atomic(html_file_path, html_chunks(title, repo_url, items))
     logging.info(f"HTML gallery created successfully at {html_file_path}")
 
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
     parser = argparse.ArgumentParser(description="Create a gallery")
     parser.add_argument("imagedir", help="Directory containing the images")
     parser.add_argument("outputdir", help="Directory to save the output")
     parser.add_argument("title", help="Title of the HTML page")
     parser.add_argument("repo_url", help="External repository URL for download links")
+    parser.add_argument("--fast-thumbnails", action="store_true",
+                        help="Decode JPEGs at the nearest reduced scale above the thumbnail size")
+    parser.add_argument("--from-index", action="store_true",
+                        help=f"Rebuild the HTML from {THUMBNAIL_INDEX} only, without reading imagedir")
+    parser.add_argument("--heights", type=int, nargs="+", default=list(THUMBNAIL_HEIGHTS),
+                        help="Thumbnail heights of the rendition ladder, largest first")
+    parser.add_argument("--formats", nargs="+", default=[f"{ext}:{q}" for ext, q in THUMBNAIL_FORMATS.items()],
+                        help="Thumbnail encoders as ext[:quality], most efficient first (webp is always kept)")
+    parser.add_argument("--report", action="store_true", help="Print the bytes per thumbnail height and format")
+    parser.add_argument("--files", nargs="+", help="Only these images (default: all of imagedir, or of the index with --from-index)")
     args = parser.parse_args()
 
-    generate_html(args.imagedir, args.outputdir, args.title, args.repo_url)
\ No newline at end of file
+    generate_html(args.imagedir, args.outputdir, args.title, args.repo_url, fast=args.fast_thumbnails,
+                  from_index=args.from_index, heights=tuple(sorted(args.heights, reverse=True)),
+                  formats=available_formats(parse_formats(args.formats)), filenames=args.files)
+    if args.report:
+        print_report(args.outputdir, rendition_bytes(args.outputdir))
\ No newline at end of file
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+# Checkpoints of one album run of automate_gallery.py, so an interrupted run can be resumed (--resume)
+#
+# Per photo the journal keeps the stages it went through, each step being safe to redo:
+#   watermarked  the copy in the temp directory is complete (with its thumbnails when single_decode is on)
+#   blob         the copy was uploaded as a git blob (git-data backend), 'blob_sha' holds its SHA
+#   uploaded     the copy is on the photo repo, 'blob_sha' holds its SHA
+#   deleted      the photo was removed from the photo repo
+# plus album stages (like 'gallery') that any later photo checkpoint invalidates.
+# Photo entries remember the size/mtime of the source, so a photo edited since the checkpoint starts over.
+# The journal is keyed by everything that changes the outputs; a journal with another key is ignored.
+SAVE_INTERVAL = 1.0
+
+class RunJournal:
+    def __init__(self, path, key, resume=True):
+        # path None keeps the journal in memory only
+        self.path = path
+        self.data = {'key': key, 'files': {}, 'album': []}
+        self.resumed = False
+        self.saved_at = 0.0
+        if path and resume and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if data and data.get('key') == key:
+                self.data = data
+                self.resumed = True
+
+    def entry(self, filename, stat=None):
+        # Checkpoint of a photo, or None when there is none or the source changed since
+        entry = self.data['files'].get(filename)
+        if entry is None or (stat is not None and entry.get('stat') != list(stat)):
+            return None
+        return entry
+
+    def done(self, filename, stage, stat=None):
+        entry = self.entry(filename, stat)
+        return entry is not None and stage in entry['stages']
+
+    def mark(self, filename, stage, stat=None, **fields):
+        entry = self.entry(filename, stat)
+        if entry is None:
+            entry = self.data['files'][filename] = {'stat': list(stat) if stat is not None else None, 'stages': []}
+        if stage not in entry['stages']:
+            entry['stages'].append(stage)
+        entry.update(fields)
+        self.data['album'] = []
+        self.save()
+
+    def album_done(self, stage):
+        return stage in self.data['album']
+
+    def mark_album(self, stage):
+        if stage not in self.data['album']:
+            self.data['album'].append(stage)
+        self.save(force=True)
+
+    def save(self, force=False):
+        # Atomic, and at most every SAVE_INTERVAL seconds unless forced: losing the last second of
+        # checkpoints only means redoing that work
+        if not self.path or (not force and time.monotonic() - self.saved_at < SAVE_INTERVAL):
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.saved_at = time.monotonic()
+
+    def discard(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
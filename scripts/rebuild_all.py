@@ -0,0 +1,123 @@
+import argparse
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import gallery
+
+# Rebuild every album under images/ after a change to thumbnail sizes, quality or the HTML template.
+#
+#   python3 scripts/rebuild_all.py --source-root '../RocknBirra-Foto{year}'
+#
+# Thumbnails of every image of every album are scheduled on one shared process pool; images whose
+# thumbnails are up to date (see gallery.thumbnail_entry) are skipped unless --force is given.
+
+def discover_albums(images_root, source_root):
+    albums = []
+    for html_file_path in sorted(glob.glob(os.path.join(images_root, '*', '*', 'gallery.html'))):
+        outputdir = os.path.dirname(html_file_path)
+        date_str = os.path.basename(outputdir)
+        year = os.path.basename(os.path.dirname(outputdir))
+        title, repo_url, _ = gallery.parse_gallery_html(html_file_path)
+        imagedir = os.path.join(source_root.format(year=year), date_str)
+        filenames = []
+        if os.path.isdir(imagedir):
+            filenames = sorted(f for f in os.listdir(imagedir) if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+        albums.append({'name': f"{year}/{date_str}", 'imagedir': imagedir, 'outputdir': outputdir,
+                       'title': title, 'repo_url': repo_url, 'filenames': filenames,
+                       'index': gallery.load_index(outputdir), 'new_index': {}, 'pending': len(filenames),
+                       'seconds': 0.0, 'updated': 0})
+    return albums
+
+def rebuild_image(image_path, outputdir, entry, fast, force, heights, formats):
+    start = time.perf_counter()
+    new_entry = gallery.thumbnail_entry(image_path, outputdir, entry, fast=fast, force=force, heights=heights,
+                                        formats=formats)
+    return new_entry, new_entry is not entry, time.perf_counter() - start
+
+def finish_album(album, heights, formats):
+    start = time.perf_counter()
+    gallery.save_index(album['outputdir'], album['new_index'])
+    gallery.generate_html(album['imagedir'], album['outputdir'], album['title'], album['repo_url'], from_index=True,
+                          heights=heights, formats=formats)
+    album['seconds'] += time.perf_counter() - start
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s"
+
+def rebuild_all(images_root, source_root, jobs=None, fast=False, force=False, heights=gallery.THUMBNAIL_HEIGHTS,
+                formats=gallery.THUMBNAIL_FORMATS, report=False):
+    albums = discover_albums(images_root, source_root)
+    for album in albums:
+        if not album['filenames']:
+            logging.warning(f"No source photos in {album['imagedir']}, keeping {album['name']} as is")
+    albums = [album for album in albums if album['filenames']]
+    total = sum(len(album['filenames']) for album in albums)
+    print(f"Rebuilding {len(albums)} albums, {total} photos")
+
+    start = time.perf_counter()
+    done = 0
+    last_report = 0.0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for album in albums:
+            for filename in album['filenames']:
+                future = executor.submit(rebuild_image, os.path.join(album['imagedir'], filename), album['outputdir'],
+                                         album['index'].get(filename), fast, force, heights, formats)
+                futures[future] = (album, filename)
+
+        for future in as_completed(futures):
+            album, filename = futures[future]
+            try:
+                entry, updated, seconds = future.result()
+                album['new_index'][filename] = entry
+                album['updated'] += updated
+                album['seconds'] += seconds
+            except Exception as e:
+                logging.error(f"Error processing image {os.path.join(album['imagedir'], filename)}: {e}")
+            album['pending'] -= 1
+            if album['pending'] == 0:
+                finish_album(album, heights, formats)
+
+            done += 1
+            elapsed = time.perf_counter() - start
+            if elapsed - last_report >= 1.0 or done == total:
+                last_report = elapsed
+                eta = elapsed / done * (total - done)
+                print(f"[{done}/{total}] {done * 100 // total}%  elapsed {format_duration(elapsed)}  "
+                      f"ETA {format_duration(eta)}", flush=True)
+
+    print(f"{'album':12} {'photos':>6} {'updated':>7} {'time':>8}")
+    for album in albums:
+        print(f"{album['name']:12} {len(album['filenames']):6} {album['updated']:7} {album['seconds']:7.1f}s")
+    print(f"Total: {len(albums)} albums, {total} photos in {format_duration(time.perf_counter() - start)}")
+    if report:
+        for album in albums:
+            gallery.print_report(album['name'], gallery.rendition_bytes(album['outputdir']))
+    return albums
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Rebuild thumbnails and gallery pages of every album")
+    parser.add_argument("--images", default="images", help="Root of the site albums (images/{year}/{date})")
+    parser.add_argument("--source-root", default="../RocknBirra-Foto{year}",
+                        help="Directory holding the source photos, {year} is substituted (a local folder works offline)")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--fast-thumbnails", action="store_true",
+                        help="Decode JPEGs at the nearest reduced scale above the thumbnail size")
+    parser.add_argument("--force", action="store_true", help="Regenerate thumbnails even if they are up to date")
+    parser.add_argument("--heights", type=int, nargs="+", default=list(gallery.THUMBNAIL_HEIGHTS),
+                        help="Thumbnail heights of the rendition ladder, largest first")
+    parser.add_argument("--formats", nargs="+",
+                        default=[f"{ext}:{q}" for ext, q in gallery.THUMBNAIL_FORMATS.items()],
+                        help="Thumbnail encoders as ext[:quality], most efficient first (webp is always kept)")
+    parser.add_argument("--report", action="store_true", help="Print the bytes per thumbnail height and format")
+    args = parser.parse_args()
+
+    rebuild_all(args.images, args.source_root, args.jobs, args.fast_thumbnails, args.force,
+                tuple(sorted(args.heights, reverse=True)), gallery.available_formats(gallery.parse_formats(args.formats)),
+                args.report)
@@ -0,0 +1,47 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from PIL import Image
+
+# Working set of one image job per decoded pixel: the RGB decode (3 bytes) plus the rotated copy that
+# exists next to it while an EXIF orientation is applied; thumbnails and encoder buffers are small next to that
+BYTES_PER_PIXEL = 6
+
+# Resident size of an idle worker process (interpreter, Pillow, the automator and its logo)
+WORKER_OVERHEAD = 60 * 2 ** 20
+
+def image_job_memory(path):
+    # Estimated from the header alone; files Pillow can't read count as their size on disk
+    size = os.path.getsize(path)
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+    except Exception:
+        return size
+    return width * height * BYTES_PER_PIXEL + size
+
+def plan_workers(workers, budget):
+    # (workers, bytes left for images): keep at least half of the budget for the images themselves
+    if not budget:
+        return workers, None
+    workers = max(1, min(workers, int(budget / 2 // WORKER_OVERHEAD)))
+    return workers, budget - workers * WORKER_OVERHEAD
+
+def submit_within_budget(executor, fn, jobs, estimate, budget):
+    """Submit fn(*job) for each job in order while the estimated memory of the jobs in flight fits in
+    budget bytes (a job is always admitted when nothing else runs, so an oversized photo still goes
+    through on its own). Yields (job, future) as they complete; no budget submits everything at once."""
+    queue = deque((job, estimate(job) if budget else 0) for job in jobs)
+    running = {}
+    in_use = 0
+    while queue or running:
+        while queue and (not budget or not running or in_use + queue[0][1] <= budget):
+            job, cost = queue.popleft()
+            running[executor.submit(fn, *job)] = (job, cost)
+            in_use += cost
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            job, cost = running.pop(future)
+            in_use -= cost
+            yield job, future
@@ -0,0 +1,182 @@
+import atexit
+import cProfile
+import functools
+import glob
+import json
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Lightweight spans for the gallery pipeline, written as a Chrome trace (chrome://tracing, ui.perfetto.dev)
+#
+#   with tracing.span("encode", format="webp") as s:
+#       ...
+#       s.set(bytes=size)
+#
+# Tracing is off unless enable() was called in this process or an ancestor: the trace directory travels
+# through the environment, so worker processes and the gallery.py subprocess pick it up on import. Each
+# process appends its events to {trace_dir}/{pid}.jsonl on flush(), and collect() merges them at the end.
+TRACE_DIR_ENV = "GALLERY_TRACE_DIR"
+CPROFILE_ENV = "GALLERY_CPROFILE"
+
+_trace_dir = os.environ.get(TRACE_DIR_ENV)
+_cprofile = bool(os.environ.get(CPROFILE_ENV))
+_events = []
+_events_pid = os.getpid()
+_profiler = None
+_profiler_pid = None
+_profile_depth = 0
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _buffer().append({'name': self.name, 'ph': 'X', 'ts': self.start / 1000, 'dur': (end - self.start) / 1000,
+                          'pid': os.getpid(), 'tid': threading.get_ident(), 'args': self.args})
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def _buffer():
+    # A forked worker starts with a copy of its parent's pending events: drop them, the parent flushes its own
+    global _events, _events_pid
+    if _events_pid != os.getpid():
+        _events, _events_pid = [], os.getpid()
+    return _events
+
+def enabled():
+    return _trace_dir is not None
+
+def span(name, **args):
+    if _trace_dir is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(func):
+    # Decorator: one span per call, named after the function
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _trace_dir is None:
+            return func(*args, **kwargs)
+        with _Span(func.__name__, {}):
+            return func(*args, **kwargs)
+    return wrapper
+
+class profiled:
+    # cProfile the enclosed block when enabled with cprofile=True; nested blocks share the outer run
+    def __enter__(self):
+        global _profiler, _profiler_pid, _profile_depth
+        if _trace_dir is not None and _cprofile:
+            # Like the events, a profiler inherited from a forked parent is not ours to dump
+            if _profiler is None or _profiler_pid != os.getpid():
+                _profiler, _profiler_pid, _profile_depth = cProfile.Profile(), os.getpid(), 0
+            if _profile_depth == 0:
+                _profiler.enable()
+            _profile_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _profile_depth
+        if _trace_dir is not None and _cprofile and _profile_depth:
+            _profile_depth -= 1
+            if _profile_depth == 0:
+                _profiler.disable()
+        return False
+
+def enable(cprofile=False):
+    # Start tracing in this process and everything it launches; returns the trace directory
+    global _trace_dir, _cprofile
+    _trace_dir = tempfile.mkdtemp(prefix="gallery-trace-")
+    _cprofile = cprofile
+    os.environ[TRACE_DIR_ENV] = _trace_dir
+    if cprofile:
+        os.environ[CPROFILE_ENV] = "1"
+    return _trace_dir
+
+def flush():
+    # Append this process's events to its part file (workers call this after each task)
+    if _trace_dir is None or not os.path.isdir(_trace_dir):
+        return
+    pid = os.getpid()
+    part_path = os.path.join(_trace_dir, f"{pid}.jsonl")
+    events = _buffer()
+    if not os.path.exists(part_path):
+        events.insert(0, {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                          'args': {'name': f"{os.path.basename(sys.argv[0]) or 'python'} {pid}"}})
+    with open(part_path, 'a') as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    events.clear()
+    if _profiler is not None and _profiler_pid == pid:
+        _profiler.dump_stats(os.path.join(_trace_dir, f"{pid}.prof"))
+
+def collect(trace_path, cprofile_path=None):
+    # Merge every process's events into one Chrome trace file and return them
+    flush()
+    events = []
+    for part_path in sorted(glob.glob(os.path.join(_trace_dir, "*.jsonl"))):
+        with open(part_path) as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    with open(trace_path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    profiles = glob.glob(os.path.join(_trace_dir, "*.prof"))
+    if cprofile_path and profiles:
+        stats = pstats.Stats(*profiles)
+        stats.dump_stats(cprofile_path)
+    shutil.rmtree(_trace_dir, ignore_errors=True)
+    return events
+
+def summary(events):
+    # Per span name: count, total/mean/max milliseconds and bytes, slowest total first
+    rows = {}
+    for event in events:
+        if event.get('ph') != 'X':
+            continue
+        row = rows.setdefault(event['name'], {'count': 0, 'total': 0.0, 'max': 0.0, 'bytes': 0})
+        row['count'] += 1
+        row['total'] += event['dur'] / 1000
+        row['max'] = max(row['max'], event['dur'] / 1000)
+        row['bytes'] += event['args'].get('bytes', 0)
+    lines = [f"{'span':32} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'MiB':>8}"]
+    for name, row in sorted(rows.items(), key=lambda item: -item[1]['total']):
+        lines.append(f"{name:32} {row['count']:6} {row['total']:10.1f} {row['total'] / row['count']:9.2f} "
+                     f"{row['max']:9.1f} {row['bytes'] / 2 ** 20:8.2f}")
+    return "\n".join(lines)
+
+def _flush_at_exit():
+    if _trace_dir is not None:
+        flush()
+
+# Covers the main process and subprocesses like gallery.py; pool workers exit without atexit and flush per task
+atexit.register(_flush_at_exit)
@@ -0,0 +1,98 @@
+import os
+import threading
+
+# Optional: inotify (or the platform equivalent) through watchdog, polling otherwise
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def snapshot(directory):
+    # {filename: (size, mtime_ns)} of the photos in a directory
+    stats = {}
+    for entry in os.scandir(directory):
+        if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+            stat = entry.stat()
+            stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+class DirectoryWatcher:
+    # wait() returns as soon as something changes in the directory (with watchdog) or after the timeout
+    def __init__(self, directory, use_events=True):
+        self.directory = directory
+        self.changed = threading.Event()
+        self.observer = None
+        if use_events and Observer is not None:
+            handler = FileSystemEventHandler()
+            handler.on_any_event = lambda event: self.changed.set()
+            self.observer = Observer()
+            self.observer.schedule(handler, directory, recursive=False)
+            self.observer.start()
+
+    @property
+    def mode(self):
+        return "events" if self.observer else "polling"
+
+    def wait(self, timeout):
+        self.changed.wait(timeout)
+        self.changed.clear()
+
+    def close(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+
+class Debouncer:
+    # Turns successive snapshots into batches: a photo is ready once its size and mtime have not changed for
+    # `settle` seconds. A batch is due when every changed photo is ready, or, while more keep arriving, once
+    # the oldest change has waited `max_wait` seconds (then only the ready ones go, the rest stay pending).
+    def __init__(self, settle, max_wait):
+        self.settle = settle
+        self.max_wait = max_wait
+        self.synced = {}
+        self.current = {}
+        self.changed_at = {}
+        self.not_before = 0.0
+
+    def update(self, stats, now):
+        for filename in set(self.current) | set(stats):
+            if self.current.get(filename) != stats.get(filename):
+                self.changed_at[filename] = now
+        self.current = stats
+
+    def dirty(self):
+        # Photos added, changed or removed since the last batch
+        return {filename for filename in set(self.synced) | set(self.current)
+                if self.synced.get(filename) != self.current.get(filename)}
+
+    def batch(self, now):
+        # (ready, pending) when a batch is due, None otherwise
+        dirty = self.dirty()
+        if not dirty or now < self.not_before:
+            return None
+        ready = {filename for filename in dirty if now - self.changed_at.get(filename, 0.0) >= self.settle}
+        pending = dirty - ready
+        if not ready:
+            return None
+        if pending and now - min(self.changed_at.get(filename, 0.0) for filename in dirty) < self.max_wait:
+            return None
+        return ready, pending
+
+    def done(self, ready):
+        for filename in ready:
+            if filename in self.current:
+                self.synced[filename] = self.current[filename]
+            else:
+                self.synced.pop(filename, None)
+
+    def retry_after(self, delay, now):
+        self.not_before = now + delay
+
+    def next_check(self, now, poll_interval):
+        # Seconds until a pending photo could become ready (capped by the poll interval)
+        waits = [self.changed_at[filename] + self.settle - now for filename in self.dirty() if filename in self.changed_at]
+        waits.append(self.not_before - now)
+        return max(0.05, min([poll_interval] + [wait for wait in waits if wait > 0]))